@@ -1,30 +1,49 @@
 # app.py
 import streamlit as st
 import socket
-import json
 import subprocess
 import signal
 import sys
-import struct
-from config_manager import save_config, download_config, load_config_file, load_config, update_config, working_directory
-from osc_manager import generate_osc_messages, send_osc_batch
+import re
+from config_manager import save_config, config_file_bytes, load_config_file, load_config, working_directory
+from osc_manager import DEFAULT_MTU, load_curve
+from show_state import ShowCommand, fit_toggles, get_show_state
+from push_stages import STAGE_NAMES
+from cue_list import CueList, make_cue, prepare_cues
+from mix_plan import get_mix_plan
+from session_schema import parse_destinations, session_destinations, session_toggles, store_toggles
+from osc_sender import get_osc_sender
+from ramp_engine import DEFAULT_TICK_RATE, get_ramp_engine
+from osc_receiver import console_mirror, get_osc_receiver
+from osc_capture import osc_capture
+from metrics import METRICS_ALLOWED, metrics
 import logging
+from logging.handlers import RotatingFileHandler
+from log_tail import LogTail
 import os
 
 st.set_page_config(page_title="MxA | MixAssistant")
 
+LOG_FILE_PATH = os.path.join(working_directory, 'logfile.log')
+CAPTURE_FILE_PATH = os.path.join(working_directory, 'osc_capture.osccap')
+LOG_MAX_BYTES = 10 * 1024 * 1024  # logfile.log is rotated at this size
+LOG_BACKUP_COUNT = 5
+
+def update_config(config):
+    st.session_state.config = config
+    # Cached artefacts such as the session download are rebuilt per config version
+    st.session_state.config_version = st.session_state.get('config_version', 0) + 1
+    try:
+        error = save_config(config)
+    except Exception as e:
+        error = e
+    if error is not None:
+        st.error(f"Failed to save configuration: {error}")
+
 def get_int_config(config, key, default=0):
     value_str = config.get(key, str(default))
     return int(value_str) if value_str.isdigit() else default
 
-def load_mapping(filename='mapping.json'):
-    try:
-        with open(filename, 'r') as f:
-            mapping = json.load(f)
-        return mapping
-    except FileNotFoundError:
-        return {}
-
 def get_diagnostics():
     diagnostics = {
         "Current PATH": os.environ.get('PATH'),
@@ -35,6 +54,7 @@ def get_diagnostics():
     }
     return diagnostics
 
+@st.cache_data(show_spinner=False)
 def generate_qr_code(url):
     import qrcode
     from io import BytesIO
@@ -69,6 +89,13 @@ def terminate_process_on_port(port):
 def main():
     st.title("Mix Assistant | Live v5")
 
+    # Configure basic logging, also used for the structured latency lines.
+    # Rotation caps the log size over multi-day runs. The root logger outlives
+    # reruns, so the log file is opened once per process.
+    if not logging.getLogger().handlers:
+        logging.basicConfig(level=logging.INFO, handlers=[
+            RotatingFileHandler(LOG_FILE_PATH, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)])
+
     # Load the configuration only if it's not already in the session state
     if "config" not in st.session_state:
         config = load_config()
@@ -76,6 +103,15 @@ def main():
     else:
         config = st.session_state.config
 
+    # Latency instrumentation can be switched off for production
+    metrics.enabled = METRICS_ALLOWED and config.get('metrics_enabled', True)
+
+    # Binary capture of every datagram sent and received, for osc_replay.py
+    if config.get('capture_enabled', False):
+        osc_capture.start(config.get('capture_path') or CAPTURE_FILE_PATH)
+    else:
+        osc_capture.stop()
+
     # Initialize the current page in session state if it doesn't exist
     if 'current_page' not in st.session_state:
         st.session_state.current_page = 'setup'  # Default to setup page
@@ -106,6 +142,48 @@ def setup_page(config):
     console_ip = st.text_input("Console IP", value=config.get('console_ip', ''), key="console_ip")
     send_port = st.text_input("Send Port", value=config.get('send_port', ''), key="send_port")
     receive_port = st.text_input("Receive Port", value=config.get('receive_port', ''), key="receive_port")
+    if send_port and not (send_port.isdigit() and 0 < int(send_port) < 65536):
+        st.warning(f"Send port must be between 1 and 65535, the main console is skipped: {send_port}")
+
+    # Backup engines and monitor desks receive every push sent to the main console
+    extra_destinations = st.text_area("Additional Destinations (one ip:port or ip:port@packets_per_sec per line)",
+                                      value=config.get('extra_destinations', ''), key="extra_destinations")
+    _, invalid_destinations = parse_destinations(extra_destinations)
+    for line in invalid_destinations:
+        st.warning(f"Ignoring invalid destination: {line}")
+
+    # OSC transport: bundles cut packets per push, plain messages for consoles that reject bundles
+    osc_bundle = st.checkbox("Send as OSC bundles", value=config.get('osc_bundle', False), key="osc_bundle")
+    osc_mtu = st.number_input("Bundle MTU (bytes)", 64, 65507, value=config.get('osc_mtu', DEFAULT_MTU), key="osc_mtu")
+
+    # Interpolate between whole dB steps of the mapping instead of rounding
+    interpolate_levels = st.checkbox("Interpolate fractional dB levels", value=config.get('interpolate_levels', False), key="interpolate_levels")
+
+    # Build the routing matrices with NumPy instead of the per-message Python generator.
+    # Used for full generations only (first push, resync, cue preparation); single
+    # toggle changes always take the incremental Python generator.
+    matrix_backend = st.checkbox("Use NumPy matrix backend for full pushes", value=config.get('matrix_backend', False), key="matrix_backend")
+
+    # Pacing keeps bursts from overflowing the console's input buffer
+    pacing_rate = st.number_input("Send Pacing (packets/sec, 0 = unlimited)", 0, 100000, value=config.get('pacing_rate', 0), key="pacing_rate")
+
+    # Send mutes and faders first, then artist aux sends, then FX returns
+    staged_push = st.checkbox("Staged transmission (mutes and faders first)", value=config.get('staged_push', True), key="staged_push")
+    stage_gap_ms = st.number_input("Gap between stages (ms)", 0, 1000, value=config.get('stage_gap_ms', 0), key="stage_gap_ms")
+
+    # Fade level changes in dB over the ramp time instead of jumping (0 = jump)
+    ramp_time_ms = st.number_input("Ramp time (ms, 0 = off)", 0, 10000, value=config.get('ramp_time_ms', 0), key="ramp_time_ms")
+    ramp_tick_rate = st.number_input("Ramp tick rate (updates/sec)", 1, 200, value=config.get('ramp_tick_rate', DEFAULT_TICK_RATE), key="ramp_tick_rate")
+
+    # Cues after the first also carry only what changed from the previous cue
+    cue_deltas = st.checkbox("Pre-encode cues as deltas from the previous cue", value=config.get('cue_deltas', False), key="cue_deltas")
+
+    # Per-stage timing hooks shown under Diagnostics and written to the log file
+    metrics_enabled = st.checkbox("Latency instrumentation", value=config.get('metrics_enabled', True), key="metrics_enabled")
+
+    # Append every OSC datagram to a binary capture that osc_replay.py can resend
+    capture_enabled = st.checkbox("Capture OSC traffic", value=config.get('capture_enabled', False), key="capture_enabled")
+    capture_path = st.text_input("Capture file", value=config.get('capture_path') or CAPTURE_FILE_PATH, key="capture_path")
 
     with st.expander("Artists Setup"):
         st.title("Artists Setup")
@@ -238,6 +316,20 @@ def setup_page(config):
         config['console_ip'] = console_ip
         config['send_port'] = send_port
         config['receive_port'] = receive_port
+        config['extra_destinations'] = extra_destinations
+        config['osc_bundle'] = osc_bundle
+        config['osc_mtu'] = osc_mtu
+        config['interpolate_levels'] = interpolate_levels
+        config['matrix_backend'] = matrix_backend
+        config['pacing_rate'] = pacing_rate
+        config['metrics_enabled'] = metrics_enabled
+        config['capture_enabled'] = capture_enabled
+        config['capture_path'] = capture_path
+        config['cue_deltas'] = cue_deltas
+        config['staged_push'] = staged_push
+        config['stage_gap_ms'] = stage_gap_ms
+        config['ramp_time_ms'] = ramp_time_ms
+        config['ramp_tick_rate'] = ramp_tick_rate
 
         # Saving Artists Parameters
         config['num_toggles'] = num_toggles
@@ -272,14 +364,19 @@ def setup_page(config):
 
         update_config(config)
 
-    # Download session file
-    filename = download_config(config)
-    with open(filename, 'rb') as f:
-        btn = st.download_button('Download Session File', f, file_name=os.path.basename(filename))
-
-    # Delete the file after download
-    if btn:
-        os.remove(filename)
+    # Download session file, serialized once per saved config version. Live toggles are
+    # saved by the shared show state, so its version is part of the key and its toggles
+    # go into the file.
+    show_version, artist_toggles, instrument_toggles = get_show_state(working_directory).snapshot(config)
+    download_key = (st.session_state.get('config_version', 0), show_version)
+    download_cache = st.session_state.get('download_cache')
+    if download_cache is None or download_cache[0] != download_key:
+        download_config = dict(config)
+        store_toggles(download_config, fit_toggles(artist_toggles, config.get('num_toggles', 1)),
+                      fit_toggles(instrument_toggles, config.get('num_instruments', 0)))
+        download_cache = (download_key, config_file_bytes(download_config))
+        st.session_state.download_cache = download_cache
+    st.download_button('Download Session File', download_cache[1], file_name='downloaded_config.json')
 
     # Load session file
     uploaded_file = st.file_uploader('Load Session File', type=['json'])
@@ -329,29 +426,215 @@ def setup_page(config):
     for key, value in diagnostics.items():
         st.text(f"{key}: {value}")
 
+    # Rolling latency percentiles per hot-path stage
+    if metrics.enabled:
+        st.text("Stage latency (ms):")
+        for stage, summary in metrics.percentiles().items():
+            st.text(f"{stage:<14} p50 {summary['p50']:8.3f}  p95 {summary['p95']:8.3f}  "
+                    f"p99 {summary['p99']:8.3f}  n={summary['count']}")
+        st.text("  ".join(f"{name}: {value}" for name, value in metrics.counters.items()))
+    else:
+        st.text("Latency instrumentation is off.")
+
+    capture_status = osc_capture.status()
+    if capture_status['active']:
+        st.text(f"Capturing to {capture_status['path']}: {capture_status['datagrams']} datagrams, "
+                f"{capture_status['bytes']} bytes")
+
     # Printing the last 100 lines of a log file
-    log_file_path = os.path.join(working_directory, 'logfile.log')
-    # Configure basic logging
-    logging.basicConfig(filename=log_file_path, level=logging.INFO)
+    log_file_path = LOG_FILE_PATH
+
+    # The tail reader keeps its offset between reruns and only reads what was appended
+    log_tail = st.session_state.get('log_tail')
+    if log_tail is None or log_tail.path != log_file_path:
+        log_tail = st.session_state.log_tail = LogTail(log_file_path, num_lines=100)
 
     try:
-        with open(log_file_path, 'r') as log_file:
-            log_lines = log_file.readlines()
-            last_100_lines = log_lines[-100:]
-            st.text("Last 100 lines of the log file:")
-            st.text("".join(last_100_lines))
+        last_100_lines = log_tail.read()
+        st.text("Last 100 lines of the log file:")
+        st.text("\n".join(last_100_lines))
     except FileNotFoundError:
         st.warning(f"Log file not found: {log_file_path}")
 
+SENT_COMMANDS_PAGE_SIZE = 200
+CHANNEL_AUX_PATTERN = re.compile(r'/Input_Channels/(\d+)(?:/Aux_Send/(\d+))?')
+
+def show_sent_commands():
+    # Add an expander to list each of the commands sent in an easy-to-read format,
+    # as one table built from the message records, nothing is decoded
+    sent_records = st.session_state.get('sent_records')
+    if not sent_records:
+        return
+    console_ip, send_port, records = sent_records
+
+    with st.expander(f"See OSC Commands Sent ({len(records)})", expanded=False):
+        col1, col2 = st.columns(2)
+        with col1:
+            channel_filter = st.text_input("Channel", key="sent_channel_filter").strip()
+        with col2:
+            aux_filter = st.text_input("Aux", key="sent_aux_filter").strip()
+
+        rows = {'Address': [], 'Channel': [], 'Aux': [], 'Type': [], 'Value': []}
+        for record in records:
+            match = CHANNEL_AUX_PATTERN.search(record.address)
+            channel, aux = match.groups() if match else (None, None)
+            if (channel_filter and channel != channel_filter) or (aux_filter and aux != aux_filter):
+                continue
+            rows['Address'].append(record.address)
+            rows['Channel'].append(channel)
+            rows['Aux'].append(aux)
+            rows['Type'].append(record.type_tag)
+            rows['Value'].append(record.value)
+
+        count = len(rows['Address'])
+        pages = max((count + SENT_COMMANDS_PAGE_SIZE - 1) // SENT_COMMANDS_PAGE_SIZE, 1)
+        if st.session_state.get('sent_page', 1) > pages:
+            st.session_state.sent_page = 1  # A smaller push or a narrower filter
+        page = st.number_input(f"Page (of {pages})", 1, pages, value=1, key="sent_page") if pages > 1 else 1
+        start = (page - 1) * SENT_COMMANDS_PAGE_SIZE
+        st.text(f"Sent to {console_ip} {send_port}: showing {min(start + 1, count)}-"
+                f"{min(start + SENT_COMMANDS_PAGE_SIZE, count)} of {count}")
+        st.dataframe({column: values[start:start + SENT_COMMANDS_PAGE_SIZE] for column, values in rows.items()},
+                     use_container_width=True, hide_index=True)
+
+def show_last_push(console_ip, send_port, debug_info):
+    if 'last_push' not in st.session_state:
+        return
+    result = st.session_state.last_push
+    if result is None:
+        st.warning("The show state is busy, the push is still queued.")
+        return
+    if result.error is not None:
+        st.error(f"Push failed: {result.error}")
+        return
+
+    # Kept for the commands table, which can be filtered across reruns
+    st.session_state.sent_records = (console_ip, send_port, result.records)
+
+    st.write("#")
+
+    # Display debugging information at the end (if any)
+    for info in debug_info:
+        st.text(info)
+
+    merged = f", merged from {result.commands} sessions" if result.commands > 1 else ""
+    if result.records:
+        send_stats = result.stats
+        st.success(f"OSC messages queued for sending ({len(result.records)} of {result.targets} changed{merged}).")
+        st.text(f"Datagrams: {send_stats['datagrams']}  Bundles: {send_stats['bundles']}  "
+                f"Messages: {send_stats['messages']}  Bytes: {send_stats['bytes']}  "
+                f"Duplicates removed: {send_stats['coalesced']}")
+        if len(send_stats['stages']) > 1:
+            st.text('  '.join(f"{name}: {count}" for name, count in zip(STAGE_NAMES, send_stats['stages'])))
+    else:
+        st.info(f"Console is already up to date, nothing to send{merged}.")
+
+def watch_show_state(show, version):
+    if show.version != version:
+        st.rerun()
+
+if hasattr(st, 'fragment'):
+    watch_show_state = st.fragment(run_every=1.0)(watch_show_state)
+
+def get_cue_list(config):
+    # Cues are generated and encoded once per session/mapping change, GO only sends
+    plan = get_mix_plan(config, load_curve(working_directory))
+    bundle, mtu = config.get('osc_bundle', False), config.get('osc_mtu', DEFAULT_MTU)
+    deltas = config.get('cue_deltas', False)
+    key = (repr(config.get('cues', [])), bundle, mtu, deltas)
+
+    cached = st.session_state.get('cue_list')
+    if cached is None or cached[0] is not plan or cached[1] != key:
+        cue_list = CueList(prepare_cues(config, working_directory, deltas, bundle, mtu))
+        if cached is not None:
+            cue_list.standby = min(cached[2].standby, max(len(cue_list.cues) - 1, 0))
+        cached = (plan, key, cue_list)
+        st.session_state.cue_list = cached
+    return cached[2]
+
+def fire_cue(config, cue_list, index=None):
+    destinations = session_destinations(config)
+    if not destinations or not cue_list.cues:
+        return
+    sender = get_osc_sender(config.get('pacing_rate', 0))
+    if index is None:
+        cue_list.go(destinations, sender)
+    else:
+        cue_list.fire(index, destinations, sender)
+
+    # Show the fired cue on the toggles; the next Send diffs against it
+    cue = cue_list.cues[cue_list.last_fired]
+    for i, toggle in enumerate(cue.artist_toggles):
+        st.session_state[f'artist_toggle_{i}'] = toggle
+    for i, toggle in enumerate(cue.instrument_toggles):
+        st.session_state[f'instrument_toggle_{i}'] = toggle
+    store_toggles(config, cue.artist_toggles, cue.instrument_toggles)
+    st.session_state.show_sync_all = True
+    # Already sent: the shared show state only records it as the new baseline
+    get_show_state(working_directory).submit(ShowCommand(
+        config, dict(enumerate(cue.artist_toggles)), dict(enumerate(cue.instrument_toggles)), push=False)).wait(1.0)
+
+def record_cue(config, artist_toggles, instrument_toggles):
+    name = st.session_state.get('cue_name', '').strip() or f"Cue {len(config.get('cues', [])) + 1}"
+    config['cues'] = config.get('cues', []) + [make_cue(name, artist_toggles, instrument_toggles)]
+    update_config(config)
+
+def delete_cue(config, index):
+    cues = list(config.get('cues', []))
+    if 0 <= index < len(cues):
+        del cues[index]
+        config['cues'] = cues
+        update_config(config)
+
+def show_cue_list(config, artist_toggles, instrument_toggles):
+    st.title("Cue List")
+    try:
+        cue_list = get_cue_list(config)
+    except FileNotFoundError as e:
+        st.error(str(e))
+        return
+
+    if cue_list.cues and not session_destinations(config):
+        st.warning("No console destination configured, cues cannot be fired.")
+    if cue_list.cues:
+        names = [f"{i + 1}. {cue.name}" for i, cue in enumerate(cue_list.cues)]
+        st.text(f"Standby: {names[cue_list.standby]}")
+        if cue_list.last_fired is not None:
+            st.text(f"Last fired: {names[cue_list.last_fired]}{' (delta)' if cue_list.last_delta else ''}  "
+                    f"Fire latency: {cue_list.last_latency * 1000:.2f} ms")
+
+        col1, col2, col3, col4 = st.columns([1, 1, 1, 2])
+        with col1:
+            st.button("Previous", on_click=cue_list.previous, key="cue_previous")
+        with col2:
+            st.button("GO", on_click=fire_cue, args=(config, cue_list), type="primary", key="cue_go")
+        with col3:
+            st.button("Next", on_click=cue_list.next, key="cue_next")
+        with col4:
+            st.button("Delete Standby Cue", on_click=delete_cue, args=(config, cue_list.standby), key="cue_delete")
+    else:
+        st.text("No cues recorded yet.")
+
+    # Store the toggles currently shown as a new cue at the end of the list
+    st.text_input("Cue Name", key="cue_name")
+    st.button("Record Cue", on_click=record_cue, args=(config, artist_toggles, instrument_toggles), key="cue_record")
+
 def show_page(config):
     # Initialize debug_info as an empty list
     debug_info = []
 
-    # Load the mapping and configuration
-    mapping = load_mapping('mapping.json')
+    # Load the configuration
     console_ip = config.get('console_ip', '')
     send_port = get_int_config(config, 'send_port', 0)  # Provide a default value of 0 if send_port is missing or empty
-    osc_messages = []
+    receive_port = get_int_config(config, 'receive_port', 0)
+
+    # Listen for console updates so pushes are diffed against what the desk actually holds
+    receiver = None
+    if receive_port:
+        try:
+            receiver = get_osc_receiver(receive_port)
+        except OSError as e:
+            st.warning(f"Unable to listen on receive port {receive_port}: {e}")
 
     num_toggles = config.get('num_toggles', 1)
     num_instruments = config.get('num_instruments', 0)
@@ -360,6 +643,28 @@ def show_page(config):
     artist_names = [config.get(f'name{i+1}', f'Artist {i+1}') for i in range(num_toggles)]
     instrument_names = [config.get(f'inst_name{i+1}', f'Instrument {i+1}') for i in range(num_instruments)]
 
+    # Live toggles are shared by every connected phone. Pull in changes sent from other
+    # sessions, but keep toggles this session flicked and has not sent yet.
+    show = get_show_state(working_directory)
+    version, shared_artists, shared_instruments = show.snapshot(config)
+    shared_artists = fit_toggles(shared_artists, num_toggles)
+    shared_instruments = fit_toggles(shared_instruments, num_instruments)
+    seen = st.session_state.get('show_seen')
+    sync_all = st.session_state.pop('show_sync_all', False) or seen is None
+    if st.session_state.get('show_version') != version or sync_all:
+        for key, shared, previous in (('artist_toggle_', shared_artists, seen[0] if seen else None),
+                                      ('instrument_toggle_', shared_instruments, seen[1] if seen else None)):
+            for i, toggle in enumerate(shared):
+                widget_key = f'{key}{i}'
+                locally_changed = (not sync_all and i < len(previous) and widget_key in st.session_state
+                                   and st.session_state[widget_key] != previous[i])
+                if not locally_changed:
+                    st.session_state[widget_key] = toggle
+        store_toggles(config, shared_artists, shared_instruments)
+        st.session_state.show_version = version
+        st.session_state.show_seen = (shared_artists, shared_instruments)
+        seen = st.session_state.show_seen
+
     st.title("Artists Live")
 
     # Create a matrix of toggle switches for Artists in a 4-column layout
@@ -368,8 +673,8 @@ def show_page(config):
         for j in range(4):
             if i + j < num_toggles:  # Check if there's an artist to display
                 with cols[j]:
-                    toggle_state = config.get(f'toggle_page2_{i+j+1}', False)
-                    artist_toggle = st.toggle(artist_names[i+j], key=f'artist_toggle_{i+j}', value=toggle_state)
+                    # The value comes from the shared show state, set above
+                    artist_toggle = st.toggle(artist_names[i+j], key=f'artist_toggle_{i+j}')
                     config[f'toggle_page2_{i+j+1}'] = artist_toggle
 
     st.title("Featured Instruments Live")
@@ -380,88 +685,74 @@ def show_page(config):
         for j in range(4):
             if i + j < num_instruments:  # Check if there's an instrument to display
                 with cols[j]:
-                    toggle_state = config.get(f'inst_toggle_{i+j+1}', False)
-                    instrument_toggle = st.toggle(instrument_names[i+j], key=f'instrument_toggle_{i+j}', value=toggle_state)
+                    instrument_toggle = st.toggle(instrument_names[i+j], key=f'instrument_toggle_{i+j}')
                     config[f'inst_toggle_{i+j+1}'] = instrument_toggle
                     
     # Reconstruct artist_toggles and instrument_toggles lists from config
-    artist_toggles = [config.get(f'toggle_page2_{i+1}', False) for i in range(num_toggles)]
-    instrument_toggles = [config.get(f'inst_toggle_{i+1}', False) for i in range(num_instruments)]
-    
-    # Call generate_osc_messages with the reconstructed lists
-    osc_messages = generate_osc_messages(config, artist_toggles, instrument_toggles, working_directory)
+    artist_toggles, instrument_toggles = session_toggles(config)
 
+    # Messages are only generated when Send is pressed, flicking a toggle just reruns the page
     st.write("#")
 
-    if st.button("Send to Console"):
-        # Generate OSC messages based on the toggle states and configurations
-        osc_messages = generate_osc_messages(config, artist_toggles, instrument_toggles, working_directory)
-        
-        # Add an expander to list each of the commands sent in an easy-to-read format
-        with st.expander("See OSC Commands Sent", expanded=False):
-            for msg in osc_messages:
-                # Decode the address from the OSC message
-                address_end_index = msg.find(b'\x00', 1)
-                address = msg[:address_end_index].decode('utf-8').strip('\x00')
-
-                # Find the type tag start
-                type_tag_index = address_end_index + (4 - (address_end_index % 4))  # Skip to end of padding
-                type_tag_start = msg.find(b',', type_tag_index) + 1  # Find start of type tags
-                type_tag_end = msg.find(b'\x00', type_tag_start)
-                type_tag = msg[type_tag_start+1:type_tag_end].decode('utf-8', errors='ignore')
-                type_tags = msg[type_tag_start:type_tag_end].decode('utf-8')
-
-                # Decode the value(s) based on the type tag
-                values = []
-                value_start_index = type_tag_end + (4 - (type_tag_end % 4))  # Adjust for padding
-                values = []  # To handle multiple values if needed
-                for tag in type_tags:
-                    if tag == 'i':
-                        # Ensure buffer is large enough for an integer
-                        if value_start_index + 4 <= len(msg):  # 4 bytes for integer
-                            value, = struct.unpack_from('>i', msg, value_start_index)
-                            value_start_index += 4
-                            values.append(str(value))
-                        else:
-                            print("Error: Buffer too small for unpacking integer")
-                            # Handle the error (skip or log)
-
-                    elif tag == 'f':
-                        # Ensure buffer is large enough for a float
-                        if value_start_index + 4 <= len(msg):  # 4 bytes for float
-                            value, = struct.unpack_from('>f', msg, value_start_index)
-                            value_start_index += 4
-                            values.append(str(value))
-                        else:
-                            print("Error: Buffer too small for unpacking float")
-                            # Handle the error (skip or log)
-
-                # Combine address, type tags, and values into a readable message
-                readable_msg = f"{console_ip} {send_port} {address} {' '.join(type_tags + ' ' + v for v in values)}"
-                st.text(readable_msg)
-
-        st.write("#")
-
-        # Display debugging information at the end (if any)
-        for info in debug_info:
-            st.text(info)
-
-        # Send all constructed OSC messages in a batch
-        if osc_messages:
-            send_osc_batch(console_ip, send_port, osc_messages)
-            st.success("OSC messages sent successfully.")
-        else:
-            st.warning("No OSC messages to send.")
-
-        # Save the state of Artists Live toggles
-        for i in range(num_toggles):
-            config[f'toggle_page2_{i+1}'] = artist_toggles[i]
+    # Resend every parameter instead of only the ones changed since the last push
+    force_resync = st.checkbox("Force full resync", value=False, key="force_resync")
 
-        # Save the state of Featured Instruments Live toggles
-        for i in range(num_instruments):
-            config[f'inst_toggle_{i+1}'] = instrument_toggles[i]
+    if not session_destinations(config):
+        st.warning("No console destination configured, set the Console IP and Send Port on the setup page.")
 
-        update_config(config)
+    if st.button("Send to Console"):
+        # Only the toggles this session changed are submitted; changes from every phone
+        # within a short window are merged into one push by the shared show state
+        artist_changes = {i: toggle for i, toggle in enumerate(artist_toggles)
+                          if i >= len(seen[0]) or toggle != seen[0][i]}
+        instrument_changes = {i: toggle for i, toggle in enumerate(instrument_toggles)
+                              if i >= len(seen[1]) or toggle != seen[1][i]}
+        result = show.submit(ShowCommand(config, artist_changes, instrument_changes, force_resync,
+                                         observe=receiver is not None)).wait(5.0)
+
+        # Shown after the rerun below, which lines every toggle up with the merged state
+        st.session_state.last_push = result
+        st.session_state.show_sync_all = True
+        st.rerun()
+
+    show_last_push(console_ip, send_port, debug_info)
+
+    # Rerun when another phone changes the shared state
+    watch_show_state(show, st.session_state.show_version)
+
+    show_sent_commands()
+
+    show_cue_list(config, artist_toggles, instrument_toggles)
+
+    # Background sender status, the drain time covers the last push that finished
+    sender_status = get_osc_sender().status()
+    last_drain_time = sender_status['last_drain_time']
+    st.text(f"Sender queue depth: {sender_status['queue_depth']} packets  "
+            f"Last drain time: {'-' if last_drain_time is None else f'{last_drain_time * 1000:.1f} ms'}")
+    if sender_status['last_push_time'] is not None:
+        st.text(f"Time to first audible change: {sender_status['last_first_audible'] * 1000:.1f} ms  "
+                f"Total push time: {sender_status['last_push_time'] * 1000:.1f} ms")
+    if sender_status['last_error']:
+        st.error(f"Last send failed: {sender_status['last_error']}")
+    if len(sender_status['destinations']) > 1:
+        for name, counters in sender_status['destinations'].items():
+            drain_time = counters['last_drain_time']
+            st.text(f"{name}: {counters['pushes']} pushes  {counters['datagrams']} datagrams  "
+                    f"{counters['errors']} errors  "
+                    f"Last drain time: {'-' if drain_time is None else f'{drain_time * 1000:.1f} ms'}"
+                    f"{'  Last error: ' + str(counters['last_error']) if counters['last_error'] else ''}")
+
+    if config.get('ramp_time_ms', 0) > 0:
+        ramp_status = get_ramp_engine().status()
+        last_jitter = ramp_status['last_jitter']
+        st.text(f"Ramps running: {ramp_status['ramps']}  Ticks: {ramp_status['ticks']} at {ramp_status['tick_rate']}/s  "
+                f"Tick jitter: {'-' if last_jitter is None else f'{last_jitter * 1000:.2f} ms'} "
+                f"(max {ramp_status['max_jitter'] * 1000:.2f} ms)")
+
+    if receiver:
+        mirror_status = console_mirror.status()
+        st.text(f"Console mirror: {mirror_status['addresses']} addresses  "
+                f"{mirror_status['packets']} packets received  {mirror_status['decode_errors']} decode errors")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,257 @@
+# benchmark.py
+#
+# Show-scale benchmarks for message generation, encoding and sending.
+#
+#   python benchmark.py                           # full suite, writes benchmark_results.json
+#   python benchmark.py --sizes 8 32 --repeat 20
+#   python benchmark.py --destinations 3 --pacing-rate 2000   # fan-out to backups, paced
+#   python benchmark.py --compare old_results.json
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import platform
+import threading
+import statistics
+from osc_manager import coalesce_osc_targets, create_osc_message, encode_osc_batch, generate_osc_targets
+from osc_sender import OscSender
+
+MAPPING_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_SIZES = [1, 2, 4, 8, 16, 32]
+DEFAULT_DENSITIES = [0.0, 0.25, 0.5, 1.0]
+
+
+def make_config(num_artists, num_fx_units, num_instruments, seed=0):
+    # Synthetic session with distinct channels and auxes, as laid out on a real desk
+    rng = random.Random(seed)
+    config = {
+        'num_toggles': num_artists,
+        'num_fx_units': num_fx_units,
+        'num_instruments': num_instruments,
+    }
+    for i in range(1, num_artists + 1):
+        config[f'name{i}'] = f'Artist {i}'
+        config[f'ch_map{i}'] = i
+        config[f'aux_map{i}'] = i
+        config[f'effects_unit{i}'] = rng.randint(1, num_fx_units) if num_fx_units else 0
+        config[f'effects_ref_level{i}'] = rng.randint(-20, 0)
+        config[f'co_artists_ref_level{i}'] = rng.randint(-20, 0)
+    for k in range(1, num_fx_units + 1):
+        config[f'fx_unit{k}'] = f'FX {k}'
+        config[f'fx_ch_map{k}'] = 64 + k
+        config[f'fx_aux_map{k}'] = 32 + k
+    for k in range(1, num_instruments + 1):
+        config[f'inst_name{k}'] = f'Instrument {k}'
+        config[f'inst_ch_map{k}'] = 96 + k
+        config[f'inst_fx_unit{k}'] = rng.randint(1, num_fx_units) if num_fx_units else 0
+        config[f'inst_fx_lvl{k}'] = rng.randint(-10, 0)
+    return config
+
+def make_toggles(count, density, seed=0):
+    rng = random.Random(seed)
+    return [rng.random() < density for _ in range(count)]
+
+
+class UdpSink:
+    # Loopback stand-in for the console that only counts what arrives
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.settimeout(0.2)
+        self.port = self.sock.getsockname()[1]
+        self.packets = 0
+        self.bytes = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        buffer = bytearray(65535)
+        while self.running:
+            try:
+                size = self.sock.recv_into(buffer)
+            except socket.timeout:
+                continue
+            self.packets += 1
+            self.bytes += size
+
+    def reset(self):
+        self.packets = 0
+        self.bytes = 0
+
+    def settle(self, expected, timeout=1.0):
+        # Wait until everything sent arrived, or give up and report the loss
+        deadline = time.monotonic() + timeout
+        while self.packets < expected and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return self.packets
+
+    def close(self):
+        self.running = False
+        self.thread.join()
+        self.sock.close()
+
+
+def timed(function, repeat):
+    # Median wall time in milliseconds, and the result of the last call
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def run_case(sinks, sender, size, density, backend, repeat, seed):
+    # Both backends are encoded and sent after coalescing, as push_osc_targets does,
+    # so every stage after generation works on the same message set
+    config = make_config(size, size, size, seed)
+    config['matrix_backend'] = backend == 'numpy'
+    artist_toggles = make_toggles(size, density, seed)
+    instrument_toggles = make_toggles(size, density, seed + 1)
+
+    generate_ms, generated_targets = timed(
+        lambda: generate_osc_targets(config, artist_toggles, instrument_toggles, MAPPING_DIRECTORY), repeat)
+    coalesce_ms, (osc_targets, coalesced) = timed(lambda: coalesce_osc_targets(generated_targets), repeat)
+    encode_ms, osc_messages = timed(lambda: encode_osc_batch(osc_targets, vectorize=False), repeat)
+    encode_numpy_ms = None
+    if 'numpy' in available_backends():
+        encode_numpy_ms, _ = timed(lambda: encode_osc_batch(osc_targets, vectorize=True), repeat)
+    encode_per_message_ms, _ = timed(
+        lambda: [create_osc_message(address, value) for address, value in osc_targets], repeat)
+
+    result = {
+        'artists': size,
+        'fx_units': size,
+        'instruments': size,
+        'density': density,
+        'backend': backend,
+        'generated_messages': len(generated_targets),
+        'messages': len(osc_targets),
+        'coalesced': coalesced,
+        'bytes': sum(len(message) for message in osc_messages),
+        'destinations': len(sinks),
+        'pacing_rate': sender.pacing_rate,
+        'generate_ms': generate_ms,
+        'coalesce_ms': coalesce_ms,
+        'encode_ms': encode_ms,
+        'encode_numpy_ms': encode_numpy_ms,
+        'encode_per_message_ms': encode_per_message_ms,
+    }
+
+    # Through the background sender as the app pushes: submit until every destination drained
+    destinations = [('127.0.0.1', sink.port) for sink in sinks]
+    for mode, bundle in (('messages', False), ('bundle', True)):
+        for sink in sinks:
+            sink.reset()
+        sent = 0
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            job = sender.submit(destinations, osc_messages, bundle=bundle)
+            job.wait()
+            samples.append((time.perf_counter() - start) * 1000)
+            sent += job.sent
+        received = sum(sink.settle(sent // len(sinks)) for sink in sinks)
+        result[f'send_{mode}_ms'] = statistics.median(samples)
+        result[f'send_{mode}_packets_sent'] = sent
+        result[f'send_{mode}_packets_received'] = received
+    return result
+
+
+def available_backends():
+    backends = ['python']
+    try:
+        import numpy  # noqa: F401
+        backends.append('numpy')
+    except ImportError:
+        pass
+    return backends
+
+def run_suite(sizes, densities, backends, repeat, seed, destinations=1, pacing_rate=0):
+    sinks = [UdpSink() for _ in range(destinations)]
+    sender = OscSender(pacing_rate)
+    results = []
+    try:
+        for backend in backends:
+            for size in sizes:
+                for density in densities:
+                    result = run_case(sinks, sender, size, density, backend, repeat, seed)
+                    results.append(result)
+                    encode_numpy = ('' if result['encode_numpy_ms'] is None
+                                    else f"np {result['encode_numpy_ms']:7.3f} ms  ")
+                    print(f"{backend:>6} {size:>3} x{density:<5} {result['generated_messages']:>6}->{result['messages']:<6} msgs "
+                          f"{result['bytes']:>8} B  gen {result['generate_ms']:8.3f} ms  "
+                          f"enc {result['encode_ms']:7.3f} ms  {encode_numpy}"
+                          f"send {result['send_messages_ms']:8.3f} ms "
+                          f"({result['send_messages_packets_received']}/{result['send_messages_packets_sent']})  "
+                          f"bundle {result['send_bundle_ms']:7.3f} ms "
+                          f"({result['send_bundle_packets_received']}/{result['send_bundle_packets_sent']})")
+    finally:
+        for sink in sinks:
+            sink.close()
+    return results
+
+
+def case_key(result):
+    return (result['backend'], result['artists'], result['density'])
+
+def compare(results, baseline_path):
+    # Ratio of each timed stage against a previous run, > 1.0 is slower than the baseline
+    with open(baseline_path, 'r') as f:
+        baseline = {case_key(r): r for r in json.load(f)['results']}
+    stages = ['generate_ms', 'coalesce_ms', 'encode_ms', 'encode_numpy_ms', 'send_messages_ms', 'send_bundle_ms']
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        previous = baseline.get(case_key(result))
+        if previous is None:
+            continue
+        ratios = '  '.join(f"{stage} x{result[stage] / previous[stage]:.2f}" if result.get(stage) and previous.get(stage)
+                           else f"{stage} -"
+                           for stage in stages)
+        print(f"{result['backend']:>6} {result['artists']:>3} x{result['density']:<5} {ratios}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OSC message generation, encoding and sending.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="artists/FX units/instruments per case (max 32 in the UI)")
+    parser.add_argument('--densities', type=float, nargs='+', default=DEFAULT_DENSITIES,
+                        help="fraction of artists and instruments toggled on")
+    parser.add_argument('--backends', nargs='+', default=None, help="python and/or numpy")
+    parser.add_argument('--destinations', type=int, default=1, help="loopback consoles every push fans out to")
+    parser.add_argument('--pacing-rate', type=int, default=0, help="datagrams per second per destination, 0 = unpaced")
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help="previous results file to compare against")
+    args = parser.parse_args()
+
+    results = run_suite(args.sizes, args.densities, args.backends or available_backends(), args.repeat, args.seed,
+                        max(1, args.destinations), args.pacing_rate)
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version,
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'destinations': max(1, args.destinations),
+        'pacing_rate': args.pacing_rate,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=4)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# cli.py
+#
+# Push a session to the console without the Streamlit app, for foot switches,
+# MIDI triggers and show-control scripts.
+#
+#   python cli.py                                  # push the saved session's toggles
+#   python cli.py --on Vocals --off 3 --inst-on Sax
+#   python cli.py --all-off --on "Lead Vocal" --save
+#   python cli.py --cue "Song 3"                   # recall a cue recorded in the app
+#   echo "on Vocals" | python cli.py --stdin       # one "<action> <artist|instrument>" per line
+#   python cli.py --capture show.osccap            # also record the datagrams for osc_replay.py
+import sys
+import argparse
+from config_manager import CONFIG_FILE, config_file_bytes, load_config, working_directory, write_atomic
+from osc_manager import DEFAULT_MTU, coalesce_osc_targets, encode_osc_records, generate_osc_targets
+from console_state import ConsoleState, push_osc_targets
+from cue_list import cue_toggles
+from osc_capture import osc_capture
+from push_stages import push_stage_options
+from session_schema import parse_destinations, session_destinations, session_toggles, store_toggles
+
+
+def resolve(names, query, kind):
+    # Case-insensitive name, or 1-based position as shown in the app
+    lowered = query.strip().lower()
+    for i, name in enumerate(names):
+        if name.lower() == lowered:
+            return i
+    if lowered.isdigit() and 1 <= int(lowered) <= len(names):
+        return int(lowered) - 1
+    raise ValueError(f"Unknown {kind}: {query}")
+
+def apply_action(action, target, artist_names, instrument_names, artist_toggles, instrument_toggles):
+    if action == 'all-off':
+        artist_toggles[:] = [False] * len(artist_toggles)
+        instrument_toggles[:] = [False] * len(instrument_toggles)
+    elif action in ('on', 'off'):
+        artist_toggles[resolve(artist_names, target, 'artist')] = action == 'on'
+    elif action in ('inst-on', 'inst-off'):
+        instrument_toggles[resolve(instrument_names, target, 'instrument')] = action == 'inst-on'
+    else:
+        raise ValueError(f"Unknown action: {action}")
+
+def read_actions(lines):
+    # "<action> <name>" per line, blank lines and # comments ignored
+    actions = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        action, _, target = line.partition(' ')
+        actions.append((action.lower(), target.strip()))
+    return actions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Set artist and instrument toggles and push them to the console.")
+    parser.add_argument('--session', default=CONFIG_FILE, help="session file (default: the app's config.json)")
+    parser.add_argument('--mapping-dir', default=working_directory, help="directory containing mapping.json")
+    parser.add_argument('--ip', help="console IP, overrides the session")
+    parser.add_argument('--port', type=int, help="console send port, overrides the session")
+    parser.add_argument('--to', action='append', default=[], metavar='IP:PORT[@RATE]',
+                        help="additional destination, e.g. a backup engine (repeatable)")
+    parser.add_argument('--on', action='append', default=[], metavar='ARTIST')
+    parser.add_argument('--off', action='append', default=[], metavar='ARTIST')
+    parser.add_argument('--inst-on', action='append', default=[], metavar='INSTRUMENT')
+    parser.add_argument('--inst-off', action='append', default=[], metavar='INSTRUMENT')
+    parser.add_argument('--cue', metavar='NAME', help="start from a cue's toggles (name or 1-based number)")
+    parser.add_argument('--all-off', action='store_true', help="switch everything off before applying --on")
+    parser.add_argument('--stdin', action='store_true', help="read further actions from stdin")
+    parser.add_argument('--bundle', action='store_true', default=None, help="pack messages into OSC bundles")
+    parser.add_argument('--mtu', type=int, help="bundle datagram size limit")
+    parser.add_argument('--save', action='store_true', help="write the resulting toggles back to the session")
+    parser.add_argument('--dry-run', action='store_true', help="print the messages instead of sending them")
+    parser.add_argument('--capture', metavar='FILE', help="append the datagrams sent to a binary capture (see osc_replay.py)")
+    parser.add_argument('--verbose', '-v', action='store_true', help="print every message pushed")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.session)
+    if not config:
+        parser.error(f"No session found at {args.session}")
+
+    artist_names = [config.get(f'name{i+1}', f'Artist {i+1}') for i in range(config.get('num_toggles', 1))]
+    instrument_names = [config.get(f'inst_name{i+1}', f'Instrument {i+1}')
+                        for i in range(config.get('num_instruments', 0))]
+    artist_toggles, instrument_toggles = session_toggles(config)
+    if args.cue:
+        cues = config.get('cues', [])
+        try:
+            cue = cues[resolve([cue.get('name', '') for cue in cues], args.cue, 'cue')]
+        except ValueError as e:
+            parser.exit(2, f"{parser.prog}: error: {e}\n")
+        artist_toggles, instrument_toggles = cue_toggles(cue, len(artist_toggles), len(instrument_toggles))
+
+    actions = [('all-off', '')] if args.all_off else []
+    actions += [('off', name) for name in args.off] + [('on', name) for name in args.on]
+    actions += [('inst-off', name) for name in args.inst_off] + [('inst-on', name) for name in args.inst_on]
+    if args.stdin:
+        actions += read_actions(sys.stdin)
+    try:
+        for action, target in actions:
+            apply_action(action, target, artist_names, instrument_names, artist_toggles, instrument_toggles)
+        osc_targets = generate_osc_targets(config, artist_toggles, instrument_toggles, args.mapping_dir)
+    except (ValueError, FileNotFoundError) as e:
+        parser.exit(2, f"{parser.prog}: error: {e}\n")
+
+    # Overrides apply to this push only, --save keeps the session's own console settings
+    console = dict(config)
+    if args.ip:
+        console['console_ip'] = args.ip
+    if args.port:
+        console['send_port'] = str(args.port)
+    extra, invalid = parse_destinations('\n'.join(args.to), console.get('pacing_rate', 0))
+    if invalid:
+        parser.error(f"Invalid destination: {invalid[0]}")
+    destinations = session_destinations(console)
+    seen = {destination[:2] for destination in destinations}
+    destinations += [destination for destination in extra if destination[:2] not in seen]
+    if not args.dry_run and not destinations:
+        parser.error("A console IP and send port are required (set them in the session or pass --ip/--port)")
+
+    bundle = config.get('osc_bundle', False) if args.bundle is None else args.bundle
+    mtu = args.mtu or config.get('osc_mtu', DEFAULT_MTU)
+    if args.dry_run:
+        # Nothing leaves the machine, the messages are only listed
+        osc_records = encode_osc_records(coalesce_osc_targets(osc_targets)[0])
+        stats = {'messages': len(osc_records), 'datagrams': 0, 'bytes': sum(len(r) for r in osc_records)}
+    else:
+        # A fresh process knows nothing about the desk, so the whole state is pushed
+        if args.capture:
+            osc_capture.start(args.capture)
+        stage_of, stage_gap = push_stage_options(config)
+        _, osc_records, stats = push_osc_targets(destinations, osc_targets, force_resync=True,
+                                                  bundle=bundle, mtu=mtu, state=ConsoleState(),
+                                                  stage_of=stage_of, stage_gap=stage_gap)
+
+    if args.verbose or args.dry_run:
+        for record in osc_records:
+            print(record.address, record.type_tag, record.value)
+
+    live = [name for name, toggle in zip(artist_names, artist_toggles) if toggle]
+    live_instruments = [name for name, toggle in zip(instrument_names, instrument_toggles) if toggle]
+    print(f"{stats['messages']} messages, {stats['datagrams']} datagrams, {stats['bytes']} bytes"
+          f"{' (dry run)' if args.dry_run else ''}; "
+          f"artists live: {', '.join(live) or '-'}; instruments live: {', '.join(live_instruments) or '-'}")
+    if stats.get('first_audible') is not None:
+        print(f"  first audible change {stats['first_audible'] * 1000:.2f} ms, "
+              f"push {stats['push_time'] * 1000:.2f} ms (stages: {stats['stages']})")
+    failed = False
+    for name, result in stats.get('destinations', {}).items():
+        print(f"  {name}: {result['datagrams']} datagrams"
+              f"{' FAILED: ' + str(result['error']) if result['error'] else ''}")
+        failed = failed or result['error'] is not None
+
+    if args.save:
+        store_toggles(config, artist_toggles, instrument_toggles)
+        write_atomic(args.session, config_file_bytes(config))
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,122 @@
 # config_manager.py
 import os
 import json
+import time
+import atexit
 import struct
-import streamlit as st
+import logging
+import tempfile
+import threading
+from metrics import metrics
+from session_schema import migrate_flat_config, load_session_data
 
 working_directory = os.path.join(os.path.expanduser('~'), 'Documents', 'MxA')
 os.makedirs(working_directory, exist_ok=True)
 
 CONFIG_FILE = os.path.join(working_directory, 'config.json')
 
-def load_config():
+def write_atomic(path, data):
+    # Write to a temp file in the same directory, then rename over the target,
+    # so a crash mid-write never leaves a truncated session behind
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.config-', suffix='.tmp')
     try:
-        with open(CONFIG_FILE, 'r') as f:
-            return json.load(f)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class SessionWriter:
+    # Coalesces saves: only the newest snapshot is written, once saves have been quiet
+    # for `delay` seconds, and at least every `max_delay` seconds while they keep coming
+
+    def __init__(self, path, delay=0.5, max_delay=2.0):
+        self.path = path
+        self.delay = delay
+        self.max_delay = max_delay
+        self.cond = threading.Condition()
+        self.write_lock = threading.Lock()
+        self.pending = None
+        self.first_pending = 0.0
+        self.due = 0.0
+        self.last_written = None
+        self.last_error = None
+        self.writes = 0
+        self.thread = None
+
+    def save(self, data):
+        with self.cond:
+            now = time.monotonic()
+            if self.pending is None:
+                self.first_pending = now
+            self.pending = data
+            self.due = min(now + self.delay, self.first_pending + self.max_delay)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='session-writer', daemon=True)
+                self.thread.start()
+            self.cond.notify()
+
+    def flush(self):
+        # Write any pending snapshot now, e.g. before reading the file back or at exit
+        with self.write_lock:
+            with self.cond:
+                data, self.pending = self.pending, None
+            if data is not None:
+                self._write(data)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while self.pending is None:
+                    self.cond.wait()
+                while (remaining := self.due - time.monotonic()) > 0:
+                    self.cond.wait(remaining)
+            self.flush()
+
+    def _write(self, data):
+        if data == self.last_written:
+            return
+        try:
+            write_atomic(self.path, data)
+            self.last_written = data
+            self.last_error = None
+            self.writes += 1
+        except Exception as e:
+            self.last_error = e
+            logging.error(f"Failed to save configuration: {e}")
+
+
+session_writer = SessionWriter(CONFIG_FILE)
+atexit.register(session_writer.flush)
+
+def load_config(path=CONFIG_FILE):
+    session_writer.flush()
+    try:
+        with metrics.stage('config_load'), open(path, 'r') as f:
+            return load_session_data(json.load(f))
     except FileNotFoundError:
         return {}
 
 def save_config(config):
-    try:
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(config, f, indent=4)
-    except Exception as e:
-        st.error(f"Failed to save configuration: {e}")
-
-def update_config(config):
-    st.session_state.config = config
-    save_config(config)
+    # Snapshot now, written later by the session writer thread.
+    # Returns the error of the last failed write, if any.
+    session_writer.save(config_file_bytes(config))
+    return session_writer.last_error
 
-def download_config(config):
-    download_file_path = os.path.join(working_directory, 'downloaded_config.json')
-    with open(download_file_path, 'w') as f:
-        json.dump(config, f, indent=4)
-    return download_file_path
+def config_file_bytes(config):
+    # Structured session file contents, for saving and for download
+    return json.dumps(migrate_flat_config(config), indent=4).encode('utf-8')
 
 def load_config_file(file):
+    # Uploaded session files may be structured or in the old flat format
     try:
-        config = json.load(file)
-        return config
-    except json.JSONDecodeError:
-        return {}
\ No newline at end of file
+        return load_session_data(json.load(file))
+    except (json.JSONDecodeError, ValueError):
+        return {}
@@ -0,0 +1,268 @@
+# console_emulator.py
+#
+# Stand-in for an SD console on the local machine: receives OSC on UDP, keeps the
+# input channel faders, mutes and aux sends it was told to set, and can model a desk
+# that only drains a finite input buffer at a fixed message rate.
+#
+#   python console_emulator.py --port 8000                       # unlimited desk
+#   python console_emulator.py --port 8000 --buffer 256 --rate 2000
+#   python console_emulator.py --port 8000 --reply-to 127.0.0.1:9000   # echo values like the desk does
+#
+# In a script: start ConsoleEmulator(0), push to emulator.address, then check
+# emulator.wait_idle(), emulator.state() and emulator.counts().
+import re
+import sys
+import time
+import socket
+import struct
+import logging
+import argparse
+import threading
+from collections import Counter, deque
+from osc_manager import create_typed_osc_message, decode_osc_packet
+
+CHANNEL_PATTERN = re.compile(r'^/sd/Input_Channels/(\d+)/(fader|mute)$')
+SEND_PATTERN = re.compile(r'^/sd/Input_Channels/(\d+)/Aux_Send/(\d+)/(send_on|send_level)$')
+
+class ChannelModel:
+    # One input channel as the desk holds it; None until a value was received
+
+    __slots__ = ('fader', 'mute', 'sends')
+
+    def __init__(self):
+        self.fader = None
+        self.mute = None
+        self.sends = {}  # aux -> {'send_on': value, 'send_level': value}
+
+    def as_dict(self):
+        return {'fader': self.fader, 'mute': self.mute, 'sends': {aux: dict(send) for aux, send in self.sends.items()}}
+
+
+class ConsoleEmulator:
+    # Receive thread: socket -> input buffer of `buffer_size` datagrams (0 = unbounded),
+    # datagrams arriving at a full buffer are dropped like on a busy desk.
+    # Processing thread: buffer -> model at `rate` messages per second (0 = as fast as parsed).
+
+    def __init__(self, port=0, host='127.0.0.1', buffer_size=0, rate=0, reply_to=None):
+        self.buffer_size = buffer_size
+        self.rate = rate
+        self.reply_to = reply_to
+        self.lock = threading.Lock()
+        self.ready = threading.Condition(self.lock)
+        self.buffer = deque()
+        self.channels = {}
+        self.values = {}  # Every address with its last value, including ones outside the model
+        self.address_counts = Counter()
+        self.received = 0
+        self.dropped = 0
+        self.processed = 0
+        self.messages = 0
+        self.decode_errors = 0
+        self.unknown_addresses = 0
+        self.max_buffered = 0
+        self.first_received_at = None
+        self.last_processed_at = None
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # A large kernel buffer, so the modeled one is what overflows
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        self.sock.bind((host, int(port)))
+        self.sock.settimeout(0.1)
+        self.address = self.sock.getsockname()
+        self.reply_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM) if reply_to else None
+        self.running = True
+        self.threads = [threading.Thread(target=self._receive, name="emulator-receive", daemon=True),
+                        threading.Thread(target=self._process, name="emulator-process", daemon=True)]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        self.running = False
+        with self.lock:
+            self.ready.notify_all()
+        for thread in self.threads:
+            thread.join()
+        self.sock.close()
+        if self.reply_sock:
+            self.reply_sock.close()
+
+    def wait_idle(self, timeout=5.0, settle=0.05):
+        # True once the buffer is empty and nothing new arrived for `settle` seconds
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self.lock:
+                received, idle = self.received, not self.buffer and self.processed + self.dropped == self.received
+            if idle:
+                time.sleep(settle)
+                with self.lock:
+                    if self.received == received and not self.buffer:
+                        return True
+            else:
+                time.sleep(0.005)
+        return False
+
+    def reset(self):
+        with self.lock:
+            self.buffer.clear()
+            self.channels = {}
+            self.values = {}
+            self.address_counts = Counter()
+            self.received = self.dropped = self.processed = self.messages = 0
+            self.decode_errors = self.unknown_addresses = self.max_buffered = 0
+            self.first_received_at = self.last_processed_at = None
+
+    def state(self):
+        # {channel: {'fader', 'mute', 'sends': {aux: {'send_on', 'send_level'}}}}
+        with self.lock:
+            return {channel: model.as_dict() for channel, model in self.channels.items()}
+
+    def counts(self):
+        # Messages applied per OSC address
+        with self.lock:
+            return dict(self.address_counts)
+
+    def snapshot(self):
+        # Last value per OSC address, in the shape of ConsoleMirror.snapshot()
+        with self.lock:
+            return dict(self.values)
+
+    def status(self):
+        with self.lock:
+            elapsed = (self.last_processed_at - self.first_received_at
+                       if self.first_received_at is not None and self.last_processed_at is not None else None)
+            return {
+                'received': self.received,
+                'dropped': self.dropped,
+                'processed': self.processed,
+                'messages': self.messages,
+                'buffered': len(self.buffer),
+                'max_buffered': self.max_buffered,
+                'decode_errors': self.decode_errors,
+                'unknown_addresses': self.unknown_addresses,
+                'messages_per_second': self.messages / elapsed if elapsed else None,
+            }
+
+    def _receive(self):
+        buffer = bytearray(65535)
+        while self.running:
+            try:
+                size = self.sock.recv_into(buffer)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                if self.running:
+                    logging.error(f"Emulator receive failed: {e}")
+                continue
+            datagram = bytes(buffer[:size])
+            with self.lock:
+                self.received += 1
+                if self.first_received_at is None:
+                    self.first_received_at = time.perf_counter()
+                if self.buffer_size and len(self.buffer) >= self.buffer_size:
+                    self.dropped += 1
+                    continue
+                self.buffer.append(datagram)
+                self.max_buffered = max(self.max_buffered, len(self.buffer))
+                self.ready.notify()
+
+    def _process(self):
+        next_message = time.perf_counter()
+        while True:
+            with self.lock:
+                self.ready.wait_for(lambda: self.buffer or not self.running)
+                if not self.running:
+                    return
+                datagram = self.buffer.popleft()
+            try:
+                messages = decode_osc_packet(datagram)
+            except (ValueError, IndexError, struct.error, UnicodeDecodeError):
+                with self.lock:
+                    self.decode_errors += 1
+                    self.processed += 1
+                continue
+
+            for address, arguments in messages:
+                if self.rate:
+                    # Deadline pacing: the desk works through a burst at its own speed
+                    next_message = max(next_message + 1.0 / self.rate, time.perf_counter())
+                    delay = next_message - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                self._apply(address, arguments)
+            with self.lock:
+                self.processed += 1
+                self.last_processed_at = time.perf_counter()
+
+    def _apply(self, address, arguments):
+        value = arguments[0] if len(arguments) == 1 else tuple(arguments)
+        with self.lock:
+            self.messages += 1
+            self.address_counts[address] += 1
+            self.values[address] = value
+            match = CHANNEL_PATTERN.match(address)
+            if match:
+                setattr(self.channels.setdefault(int(match.group(1)), ChannelModel()), match.group(2), value)
+            else:
+                match = SEND_PATTERN.match(address)
+                if match:
+                    channel = self.channels.setdefault(int(match.group(1)), ChannelModel())
+                    channel.sends.setdefault(int(match.group(2)), {'send_on': None, 'send_level': None})[
+                        match.group(3)] = value
+                else:
+                    self.unknown_addresses += 1
+        if self.reply_sock:
+            # The desk reports the value it now holds, as the receiver expects
+            try:
+                self.reply_sock.sendto(create_typed_osc_message(address, arguments), self.reply_to)
+            except OSError as e:
+                logging.error(f"Emulator reply to {self.reply_to} failed: {e}")
+
+
+def parse_address(text):
+    ip, _, port = text.rpartition(':')
+    if not ip or not port.isdigit():
+        raise argparse.ArgumentTypeError(f"Expected IP:PORT, got {text}")
+    return ip, int(port)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Emulate an SD console's OSC input for local push and load tests.")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8000, help="OSC port, the session's send port (default: 8000)")
+    parser.add_argument('--buffer', type=int, default=0, help="input buffer in datagrams, 0 = unbounded")
+    parser.add_argument('--rate', type=float, default=0, help="messages processed per second, 0 = unlimited")
+    parser.add_argument('--reply-to', type=parse_address, metavar='IP:PORT',
+                        help="send every applied value back, e.g. to the app's receive port")
+    parser.add_argument('--interval', type=float, default=1.0, help="seconds between status lines")
+    args = parser.parse_args(argv)
+
+    emulator = ConsoleEmulator(args.port, args.host, args.buffer, args.rate, args.reply_to)
+    print(f"Emulating an SD console on {emulator.address[0]}:{emulator.address[1]}, Ctrl+C to stop")
+    last = None
+    try:
+        while True:
+            time.sleep(args.interval)
+            status = emulator.status()
+            if status != last:
+                rate = status['messages_per_second']
+                print(f"received {status['received']}  dropped {status['dropped']}  messages {status['messages']}  "
+                      f"buffered {status['buffered']} (max {status['max_buffered']})  "
+                      f"{'-' if rate is None else f'{rate:.0f}'} messages/s")
+                last = status
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator.stop()
+
+    state = emulator.state()
+    for channel in sorted(state):
+        model = state[channel]
+        sends = '  '.join(f"aux {aux}: on={send['send_on']} level={send['send_level']}"
+                          for aux, send in sorted(model['sends'].items()))
+        print(f"ch {channel}: fader={model['fader']} mute={model['mute']}{'  ' + sends if sends else ''}")
+    counts = emulator.counts()
+    repeated = {address: count for address, count in counts.items() if count > 1}
+    print(f"{len(counts)} addresses, {sum(counts.values())} messages, {len(repeated)} set more than once")
+    sys.exit(1 if emulator.status()['dropped'] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# console_state.py
+import time
+import threading
+from metrics import metrics
+from osc_manager import DEFAULT_MTU, build_datagrams, coalesce_osc_targets, encode_osc_records
+from osc_sender import send_osc_stages
+from push_stages import split_stages
+
+def same_value(reported, value):
+    # Console reports come back as 32-bit floats
+    try:
+        return abs(reported - value) <= 1e-5
+    except TypeError:
+        return reported == value
+
+
+class ConsoleState:
+    # Remembers the last value pushed to each OSC address of one console (or one set of
+    # mirrored consoles), so a push only has to carry the addresses whose value actually changed.
+
+    def __init__(self):
+        self.destination = None
+        self.values = {}
+        self.committed_at = {}  # address -> monotonic time of the last commit to it
+        self.revision = 0  # Bumped whenever the remembered console state changes
+        self.lock = threading.Lock()
+
+    def reset(self):
+        with self.lock:
+            self.destination = None
+            self.values = {}
+            self.committed_at = {}
+            self.revision += 1
+
+    def knows(self, destination):
+        # False after a reset or when the remembered values belong to another console
+        with self.lock:
+            return destination == self.destination and bool(self.values)
+
+    def snapshot(self, destination):
+        # Values last pushed to `destination`, empty when the state belongs to another console
+        with self.lock:
+            return dict(self.values) if destination == self.destination else {}
+
+    def diff(self, osc_targets, destination, force_resync=False, observed=None):
+        # observed: {address: (value, received_at)} the console itself reported (see
+        # osc_receiver.ConsoleMirror.observations). A report only counts when it arrived
+        # after the last commit to that address; older ones may predate a write in flight.
+        with self.lock:
+            # Unknown console or explicit resync: send the full batch as generated
+            if force_resync or destination != self.destination:
+                return list(osc_targets)
+
+            # Only the final value per address reaches the console, keep first-seen order
+            final_values = {}
+            for address, value in osc_targets:
+                final_values[address] = value
+
+            changed_targets = []
+            recorded = False
+            for address, value in final_values.items():
+                sent_value = self.values.get(address)
+                observation = observed.get(address) if observed is not None else None
+                if observation is not None and observation[1] > self.committed_at.get(address, float('-inf')):
+                    if same_value(observation[0], value):
+                        # The desk already holds the target: remember it as if it had been sent
+                        if sent_value != value:
+                            self.values[address] = value
+                            self.committed_at[address] = time.monotonic()
+                            recorded = True
+                        continue
+                    if sent_value == value:
+                        # The operator moved a parameter this push does not change: leave it alone
+                        continue
+                elif sent_value == value:
+                    continue
+                changed_targets.append((address, value))
+            if recorded:
+                self.revision += 1
+            return changed_targets
+
+    def commit(self, sent_targets, destination):
+        with self.lock:
+            if destination != self.destination:
+                self.destination = destination
+                self.values = {}
+                self.committed_at = {}
+            now = time.monotonic()
+            for address, value in sent_targets:
+                self.values[address] = value
+                self.committed_at[address] = now
+            self.revision += 1
+
+
+# One console state per process, shared by every Streamlit session
+console_state = ConsoleState()
+
+def push_osc_targets(destinations, osc_targets, force_resync=False, bundle=False, mtu=DEFAULT_MTU,
+                     sender=None, observed=None, state=console_state, stage_of=None, stage_gap=0.0):
+    # destinations: (ip, port[, pacing_rate]) for the main console and any backups,
+    # which all receive the same encoded batch. stage_of (see push_stages) splits the
+    # push into priority stages sent stage_gap seconds apart.
+    # Returns (changed targets, OscMessage records, stats).
+    destination = tuple((ip, int(port)) for ip, port, *_ in destinations)
+    osc_targets, coalesced = coalesce_osc_targets(osc_targets)
+    metrics.count('coalesced', coalesced)
+    changed_targets = state.diff(osc_targets, destination, force_resync, observed)
+
+    stage_targets = split_stages(changed_targets, stage_of) if stage_of else [changed_targets]
+    changed_targets = [target for targets in stage_targets for target in targets]
+    osc_records = encode_osc_records(changed_targets)
+    stage_messages = []
+    offset = 0
+    for targets in stage_targets:
+        stage_messages.append([record.data for record in osc_records[offset:offset + len(targets)]])
+        offset += len(targets)
+
+    stats = {'messages': 0, 'bundles': 0, 'datagrams': 0, 'bytes': 0}
+    failed = False
+    if osc_records and destinations:
+        if sender is None:
+            stats = send_osc_stages(destinations, stage_messages, bundle, mtu, stage_gap)
+            failed = any(result['error'] for result in stats['destinations'].values())
+        else:
+            # Queued on the background sender; a failed send forces the next push to resync
+            job = sender.submit_stages(destinations, [build_datagrams(messages, bundle, mtu)
+                                                      for messages in stage_messages],
+                                       on_error=lambda e: state.reset(), gap=stage_gap)
+            stats = dict(job.stats)
+    stats['coalesced'] = coalesced
+    stats['stages'] = [len(targets) for targets in stage_targets]
+
+    # Only remember values that were handed to the wire; after a failed send
+    # the next push starts over with the full state
+    if failed:
+        state.reset()
+    else:
+        state.commit(changed_targets, destination)
+    return changed_targets, osc_records, stats
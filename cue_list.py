@@ -0,0 +1,121 @@
+# cue_list.py
+import time
+from contextlib import nullcontext
+from metrics import metrics
+from osc_manager import DEFAULT_MTU, build_datagrams, coalesce_osc_targets, encode_osc_batch, generate_osc_targets
+from console_state import console_state
+from ramp_engine import running_ramp_engine
+
+# Cues are stored in the session as config['cues']:
+#   [{'name': 'Song 1', 'artists': [True, False, ...], 'instruments': [False, ...]}, ...]
+
+def cue_toggles(cue, num_artists, num_instruments):
+    # Toggle lists sized to the current session, for cues recorded with fewer or more artists
+    artists = list(cue.get('artists', []))[:num_artists]
+    instruments = list(cue.get('instruments', []))[:num_instruments]
+    return (artists + [False] * (num_artists - len(artists)),
+            instruments + [False] * (num_instruments - len(instruments)))
+
+def make_cue(name, artist_toggles, instrument_toggles):
+    return {'name': name, 'artists': list(artist_toggles), 'instruments': list(instrument_toggles)}
+
+
+class PreparedCue:
+    # One cue's console state, generated and packed into datagrams ahead of the show
+
+    __slots__ = ('name', 'artist_toggles', 'instrument_toggles', 'targets', 'datagrams',
+                 'delta_targets', 'delta_datagrams')
+
+    def __init__(self, name, artist_toggles, instrument_toggles, targets, datagrams):
+        self.name = name
+        self.artist_toggles = artist_toggles
+        self.instrument_toggles = instrument_toggles
+        self.targets = targets
+        self.datagrams = datagrams
+        self.delta_targets = None
+        self.delta_datagrams = None
+
+
+def prepare_cues(config, working_directory=None, deltas=False, bundle=False, mtu=DEFAULT_MTU):
+    # Generate, coalesce, encode and pack every cue once, when the session is loaded.
+    # With deltas each cue also gets the batch of only what differs from the previous cue.
+    num_artists = config.get('num_toggles', 1)
+    num_instruments = config.get('num_instruments', 0)
+    prepared = []
+    with metrics.stage('cue_prepare'):
+        for index, cue in enumerate(config.get('cues', [])):
+            artist_toggles, instrument_toggles = cue_toggles(cue, num_artists, num_instruments)
+            targets, _ = coalesce_osc_targets(
+                generate_osc_targets(config, artist_toggles, instrument_toggles, working_directory))
+            prepared_cue = PreparedCue(cue.get('name') or f'Cue {index + 1}', artist_toggles, instrument_toggles,
+                                       targets, build_datagrams(encode_osc_batch(targets), bundle, mtu))
+
+            if deltas and prepared:
+                previous_values = dict(prepared[-1].targets)
+                prepared_cue.delta_targets = [(address, value) for address, value in targets
+                                              if previous_values.get(address) != value]
+                prepared_cue.delta_datagrams = build_datagrams(encode_osc_batch(prepared_cue.delta_targets),
+                                                               bundle, mtu)
+            prepared.append(prepared_cue)
+    return prepared
+
+
+class CueList:
+    # Standby pointer and GO over prepared cues. Firing hands the packed datagrams
+    # straight to the sender, nothing is generated or encoded at fire time.
+
+    def __init__(self, cues, state=console_state):
+        self.cues = cues
+        self.state = state
+        self.standby = 0
+        self.last_fired = None
+        self.last_fired_revision = None
+        self.last_latency = None
+        self.last_delta = False
+
+    def next(self):
+        if self.cues:
+            self.standby = min(self.standby + 1, len(self.cues) - 1)
+
+    def previous(self):
+        if self.cues:
+            self.standby = max(self.standby - 1, 0)
+
+    def go(self, destinations, sender, timeout=1.0):
+        # Fire the standby cue; standby moves on to the following one
+        return self.fire(self.standby, destinations, sender, timeout)
+
+    def fire(self, index, destinations, sender, timeout=1.0):
+        start = time.perf_counter()
+        cue = self.cues[index]
+        destination = tuple((ip, int(port)) for ip, port, *_ in destinations)
+
+        # The delta only holds if the desk is still where the previous cue left it
+        use_delta = (cue.delta_datagrams is not None and self.last_fired == index - 1
+                     and self.state.revision == self.last_fired_revision
+                     and self.state.destination == destination)
+        datagrams, targets = (cue.delta_datagrams, cue.delta_targets) if use_delta else (cue.datagrams, cue.targets)
+
+        # Running fades would overwrite the cue, they stop before it goes out
+        engine = running_ramp_engine()
+        with engine.cond if engine is not None else nullcontext():
+            if engine is not None:
+                engine.cancel()
+            if not use_delta:
+                self.state.reset()
+            self.state.commit(targets, destination)
+            self.last_fired_revision = self.state.revision
+            # A failed send bumps the revision again, so the next cue goes out in full
+            job = sender.submit_datagrams(destinations, datagrams, on_error=lambda e: self.state.reset())
+
+        # Fire latency: GO until the last datagram was handed to the socket
+        job.wait(timeout)
+        self.last_latency = time.perf_counter() - start
+        metrics.record('cue_fire', self.last_latency)
+        metrics.log_event('cue', cue=cue.name, delta=use_delta, datagrams=len(datagrams),
+                          latency_ms=round(self.last_latency * 1000, 3))
+
+        self.last_fired = index
+        self.last_delta = use_delta
+        self.standby = min(index + 1, len(self.cues) - 1)
+        return job
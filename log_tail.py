@@ -0,0 +1,62 @@
+# log_tail.py
+import os
+from collections import deque
+
+def read_tail(f, size, num_lines, block_size=8192):
+    # Seek backward from the end in fixed-size blocks until enough lines are found.
+    # Returns (complete lines, offset just past the last newline, trailing partial line).
+    position = size
+    data = b''
+    while position > 0 and data.count(b'\n') <= num_lines:
+        read_size = min(block_size, position)
+        position -= read_size
+        f.seek(position)
+        data = f.read(read_size) + data
+
+    last_newline = data.rfind(b'\n')
+    partial = data[last_newline + 1:]
+    lines = data[:last_newline + 1].splitlines()
+    if position > 0 and lines:
+        lines = lines[1:]  # The first line read may start mid-line
+    return lines[-num_lines:], size - len(partial), partial
+
+
+class LogTail:
+    # Last lines of a log file, refreshed incrementally from the previous offset.
+    # The cost of a refresh depends on what was appended, not on the file size.
+
+    def __init__(self, path, num_lines=100, block_size=8192, max_append=1024 * 1024):
+        self.path = path
+        self.num_lines = num_lines
+        self.block_size = block_size
+        self.max_append = max_append
+        self.lines = deque(maxlen=num_lines)
+        self.partial = b''
+        self.offset = 0
+        self.inode = None
+
+    def read(self):
+        # Raises FileNotFoundError when the log does not exist
+        stat = os.stat(self.path)
+        with open(self.path, 'rb') as f:
+            rotated = stat.st_ino != self.inode or stat.st_size < self.offset
+            appended = stat.st_size - self.offset
+
+            if rotated or appended > self.max_append:
+                lines, self.offset, self.partial = read_tail(f, stat.st_size, self.num_lines, self.block_size)
+                self.lines.clear()
+                self.lines.extend(line.decode('utf-8', errors='replace') for line in lines)
+                self.inode = stat.st_ino
+            elif appended > 0:
+                f.seek(self.offset)
+                data = f.read(appended)
+                last_newline = data.rfind(b'\n')
+                self.lines.extend(line.decode('utf-8', errors='replace')
+                                  for line in data[:last_newline + 1].splitlines())
+                self.partial = data[last_newline + 1:]
+                self.offset += last_newline + 1
+
+        lines = list(self.lines)
+        if self.partial:
+            lines.append(self.partial.decode('utf-8', errors='replace'))
+        return lines[-self.num_lines:]
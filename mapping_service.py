@@ -0,0 +1,83 @@
+# mapping_service.py
+import os
+import json
+import math
+import threading
+from metrics import metrics
+
+class FaderCurve:
+    # dB -> fader value curve from mapping.json, stored as a dense list indexed by dB offset
+
+    def __init__(self, mapping):
+        points = sorted((int(db), float(value)) for db, value in mapping.items())
+        if not points:
+            raise ValueError("Mapping file contains no dB values")
+
+        self.min_db = points[0][0]
+        self.max_db = points[-1][0]
+        self.values = [0.0] * (self.max_db - self.min_db + 1)
+
+        # Fill every whole dB step, interpolating across any gaps in the file
+        for (db, value), (next_db, next_value) in zip(points, points[1:] + points[-1:]):
+            span = max(next_db - db, 1)
+            for step in range(span):
+                self.values[db - self.min_db + step] = value + (next_value - value) * step / span
+        self.values[-1] = points[-1][1]
+
+    def value(self, db_value, interpolate=False):
+        # Levels outside the table are clamped to its ends
+        db_value = min(max(db_value, self.min_db), self.max_db)
+        if not interpolate:
+            return self.values[round(db_value) - self.min_db]
+
+        offset = db_value - self.min_db
+        index = min(math.floor(offset), len(self.values) - 2) if len(self.values) > 1 else 0
+        fraction = offset - index
+        if fraction == 0 or len(self.values) == 1:
+            return self.values[index]
+        return self.values[index] + (self.values[index + 1] - self.values[index]) * fraction
+
+    def db(self, fader_value):
+        # Inverse of value(). The bottom of the table is not monotonic, so the search
+        # runs down from the top and stops at the first step at or below the value.
+        values = self.values
+        if fader_value >= values[-1]:
+            return float(self.max_db)
+        for index in range(len(values) - 2, -1, -1):
+            if values[index] <= fader_value:
+                span = values[index + 1] - values[index]
+                fraction = (fader_value - values[index]) / span if span > 0 else 0.0
+                return self.min_db + index + fraction
+        return float(self.min_db)
+
+
+class MappingService:
+    # Parses mapping.json once per process and again only when the file's mtime changes
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.path = None
+        self.mtime = None
+        self.curve = None
+
+    def get_curve(self, filename='mapping.json', working_directory=None):
+        with metrics.stage('mapping_load'):
+            return self._get_curve(filename, working_directory)
+
+    def _get_curve(self, filename, working_directory):
+        mapping_file_path = os.path.join(working_directory, filename) if working_directory else filename
+        try:
+            mtime = os.stat(mapping_file_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        with self.lock:
+            if mapping_file_path != self.path or mtime != self.mtime:
+                with open(mapping_file_path, 'r') as f:
+                    self.curve = FaderCurve(json.load(f))
+                self.path = mapping_file_path
+                self.mtime = mtime
+            return self.curve
+
+
+mapping_service = MappingService()
@@ -0,0 +1,106 @@
+# metrics.py
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+
+class StageTimer:
+    __slots__ = ('metrics', 'stage', 'start')
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.record(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class NullTimer:
+    # Stand-in when instrumentation is switched off, nothing is timed or stored
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+NULL_TIMER = NullTimer()
+
+
+class Metrics:
+    # Rolling per-stage latency samples and push counters for the hot path:
+    # config load, mapping load, generation, encoding and UDP send
+
+    def __init__(self, window=1024, enabled=True):
+        self.enabled = enabled
+        self.window = window
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger('mxa.metrics')
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.samples = {}
+            self.pending = {}
+            self.counters = {'pushes': 0, 'messages': 0, 'datagrams': 0, 'bytes': 0, 'coalesced': 0, 'send_errors': 0}
+
+    def stage(self, name):
+        return StageTimer(self, name) if self.enabled else NULL_TIMER
+
+    def record(self, stage, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            samples = self.samples.get(stage)
+            if samples is None:
+                samples = self.samples[stage] = deque(maxlen=self.window)
+            samples.append(seconds)
+            # Time per stage since the last structured log line
+            self.pending[stage] = self.pending.get(stage, 0.0) + seconds
+
+    def count(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def percentiles(self):
+        # {stage: {'count', 'p50', 'p95', 'p99'}} in milliseconds over the rolling window
+        with self.lock:
+            snapshot = {stage: sorted(samples) for stage, samples in self.samples.items()}
+        summary = {}
+        for stage, samples in snapshot.items():
+            if not samples:
+                continue
+            last = len(samples) - 1
+            summary[stage] = {
+                'count': len(samples),
+                'p50': samples[round(last * 0.50)] * 1000,
+                'p95': samples[round(last * 0.95)] * 1000,
+                'p99': samples[round(last * 0.99)] * 1000,
+            }
+        return summary
+
+    def log_event(self, event, **fields):
+        # One JSON line in logfile.log per push or send, with the stage times since the last line
+        if not self.enabled:
+            return
+        with self.lock:
+            stages = {stage: round(seconds * 1000, 3) for stage, seconds in self.pending.items()}
+            self.pending = {}
+            counters = dict(self.counters)
+        record = {'event': event, 'time': time.time(), 'stages_ms': stages, 'counters': counters}
+        record.update(fields)
+        self.logger.info(json.dumps(record))
+
+
+# Process-wide instance; MXA_METRICS=0 switches instrumentation off entirely
+METRICS_ALLOWED = os.environ.get('MXA_METRICS', '1') != '0'
+metrics = Metrics(enabled=METRICS_ALLOWED)
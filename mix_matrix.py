@@ -0,0 +1,225 @@
+# mix_matrix.py
+import numpy as np
+from mix_plan import FADER_0DB
+
+# NumPy backend for message generation. The routing of a push is built as dense
+# arrays of address ids, values and generation positions, and reduced to the final
+# value of every address in one pass. This gives the same console state as the
+# Python generator (last write in generation order wins) without its duplicates.
+
+STAGES = 5  # stages per artist segment, see the cell layout in mix_plan
+CELL_SIZE = 8  # room for the writes inside one cell
+
+
+class MatrixPlan:
+
+    def __init__(self, plan, config, curve):
+        self.plan = plan
+        self.addresses = []
+        address_ids = {}
+
+        def ids(addresses):
+            result = []
+            for address in addresses:
+                address_id = address_ids.get(address)
+                if address_id is None:
+                    address_id = address_ids[address] = len(self.addresses)
+                    self.addresses.append(address)
+                result.append(address_id)
+            return np.array(result, dtype=np.int64)
+
+        artists = plan.artists
+        n = len(artists)
+        num_fx = len(plan.fx_units)
+        self.num_artists = n
+        self.num_fx = num_fx
+        self.num_instruments = len(plan.instruments)
+
+        self.artist_fader = ids(a.fader for a in artists)
+        self.artist_mute = ids(a.mute for a in artists)
+        self.artist_send_on = ids(s[0] for row in plan.artist_sends for s in row).reshape(n, n)
+        self.artist_send_level = ids(s[1] for row in plan.artist_sends for s in row).reshape(n, n)
+        self.artist_fx_on = ids(s[0] for row in plan.artist_fx_sends for s in row).reshape(n, num_fx)
+        self.artist_fx_level = ids(s[1] for row in plan.artist_fx_sends for s in row).reshape(n, num_fx)
+        self.fx_send_on = ids(s[0] for row in plan.fx_sends for s in row).reshape(num_fx, n)
+        self.fx_send_level = ids(s[1] for row in plan.fx_sends for s in row).reshape(num_fx, n)
+        self.fx_fader = ids(fx.fader for fx in plan.fx_units)
+        self.fx_mute = ids(fx.mute for fx in plan.fx_units)
+        self.inst_fader = ids(inst.fader for inst in plan.instruments)
+        self.inst_mute = ids(inst.mute for inst in plan.instruments)
+        self.inst_send_on = ids(inst.send[0] for inst in plan.instruments)
+        self.inst_send_level = ids(inst.send[1] for inst in plan.instruments)
+        self.inst_fx_fader, self.inst_fx_mute = ids([plan.inst_fx.fader, plan.inst_fx.mute])
+
+        # FX unit each artist is routed to, -1 when it matches no unit
+        self.fx_unit = np.array([float(a.fx_unit) for a in artists])
+        self.fx_index = np.full(n, -1, dtype=np.int64)
+        for i, artist in enumerate(artists):
+            for k in range(num_fx):
+                if artist.fx_unit == k + 1:
+                    self.fx_index[i] = k
+                    break
+
+        # Levels are mapped through the fader curve in bulk
+        co_db = np.array([float(config.get(f'co_artists_ref_level{i+1}', 0.0)) for i in range(n)])
+        fx_db = np.array([float(config.get(f'effects_ref_level{i+1}', 0.0)) for i in range(n)])
+        inst_db = np.array([float(config.get(f'inst_fx_lvl{m+1}', 0)) for m in range(self.num_instruments)])
+        interpolate = config.get('interpolate_levels', False)
+        self.co_value = map_levels(co_db, curve, interpolate)
+        self.fx_value = map_levels(fx_db, curve, interpolate)
+        self.summed_value = map_levels(co_db + fx_db, curve, interpolate)
+        self.inst_value = map_levels(inst_db, curve, interpolate)
+
+        # Static id and position arrays of every family of writes, so a push only
+        # computes masks and values
+        self.span = max(n, num_fx, self.num_instruments, 1)
+        artist_index = np.arange(n)
+        i_grid, j_grid = np.meshgrid(artist_index, artist_index, indexing='ij')
+        self.not_self = i_grid != j_grid
+
+        # Stage 0: artist fader and mute
+        self.pos_fader = self.positions(artist_index, 0, 0, 0)
+        self.pos_mute = self.positions(artist_index, 0, 0, 1)
+
+        # Stage 1: artist i channel -> artist j aux
+        self.send_ids = np.stack([self.artist_send_on[self.not_self], self.artist_send_level[self.not_self]], axis=1)
+        self.send_pos = np.stack([self.positions(i_grid, 1, j_grid, 0)[self.not_self],
+                                  self.positions(i_grid, 1, j_grid, 1)[self.not_self]], axis=1)
+        self.send_i = i_grid[self.not_self]
+        self.send_j = j_grid[self.not_self]
+
+        # Stage 2, enabled: FX unit up, send into it and its return to the artist's aux
+        k = np.maximum(self.fx_index, 0)
+        if num_fx:
+            self.routed_ids = np.stack([self.fx_fader[k], self.fx_mute[k],
+                                        self.artist_fx_on[artist_index, k], self.artist_fx_level[artist_index, k],
+                                        self.fx_send_on[k, artist_index], self.fx_send_level[k, artist_index]], axis=1)
+        else:
+            self.routed_ids = np.zeros((n, 6), dtype=np.int64)
+        self.routed_pos = self.positions(artist_index[:, None], 2, k[:, None], np.arange(6)[None, :])
+
+        # Stage 2, disabled: every FX send and return of the artist
+        di, dk = np.meshgrid(artist_index, np.arange(num_fx), indexing='ij')
+        self.muted_fx_ids = np.stack([self.artist_fx_on[di, dk], self.artist_fx_level[di, dk],
+                                      self.fx_send_on[dk, di], self.fx_send_level[dk, di]], axis=2)
+        self.muted_fx_pos = self.positions(di[:, :, None], 2, dk[:, :, None], np.arange(4)[None, None, :])
+
+        # Stage 3: return of artist i's FX unit to artist j's aux
+        if num_fx:
+            self.return_ids = np.stack([self.fx_send_on[k[:, None], j_grid], self.fx_send_level[k[:, None], j_grid]], axis=2)
+        else:
+            self.return_ids = np.zeros((n, n, 2), dtype=np.int64)
+        self.return_pos = self.positions(i_grid[:, :, None], 3, j_grid[:, :, None], np.arange(2)[None, None, :])
+        self.other_unit = self.fx_unit[None, :] != self.fx_unit[:, None]
+
+        # Stage 4: instrument blocks repeat in every segment, only the last one can win
+        m = np.arange(self.num_instruments)
+        last = n - 1
+        self.inst_on_ids = np.stack([self.inst_fader, self.inst_mute,
+                                     np.full(len(m), self.inst_fx_fader), np.full(len(m), self.inst_fx_mute),
+                                     self.inst_send_on, self.inst_send_level], axis=1)
+        self.inst_on_pos = self.positions(last, 4, m[:, None], np.arange(6)[None, :])
+        self.inst_off_ids = np.stack([self.inst_fader, self.inst_mute, self.inst_send_on, self.inst_send_level], axis=1)
+        self.inst_off_pos = self.positions(last, 4, m[:, None], np.arange(4)[None, :])
+
+        # Address strings by id, gathered with one fancy index when converting back to targets
+        self.address_array = np.array(self.addresses, dtype=object)
+
+    def positions(self, artist, stage, index, sub):
+        # Sortable generation position of a write, see the cell layout in mix_plan
+        return ((np.asarray(artist) * STAGES + stage) * self.span + index) * CELL_SIZE + sub
+
+
+def map_levels(db_values, curve, interpolate=False):
+    # Vectorized FaderCurve.value: clamp, then round (half to even, like round()) or interpolate
+    table = np.array(curve.values)
+    db_values = np.clip(db_values, curve.min_db, curve.max_db)
+    if interpolate:
+        return np.interp(db_values, np.arange(curve.min_db, curve.max_db + 1), table)
+    return table[np.rint(db_values).astype(np.int64) - curve.min_db]
+
+
+def generate_matrix_state(mplan, artist_toggles, instrument_toggles):
+    # Final (address_ids, values) of a push, ordered by the position of each final write
+    n = mplan.num_artists
+    on = np.array([bool(t) for t in artist_toggles[:n]], dtype=bool)
+    enabled_artists = sum(artist_toggles)
+    ids, values, positions = [], [], []
+
+    # Stage 0: artist fader and mute
+    ids += [mplan.artist_fader, mplan.artist_mute]
+    values += [np.where(on, FADER_0DB, 0.0), np.zeros(n)]
+    positions += [mplan.pos_fader, mplan.pos_mute]
+
+    # Stage 1: on at the co-artist level when both artists are enabled
+    both_on = on[mplan.send_i] & on[mplan.send_j]
+    ids.append(mplan.send_ids.ravel())
+    values.append(np.stack([both_on, np.where(both_on, mplan.co_value[mplan.send_i], 0.0)], axis=1).ravel())
+    positions.append(mplan.send_pos.ravel())
+
+    if mplan.num_fx:
+        # Stage 2, enabled artists routed to an FX unit
+        routed = on & (mplan.fx_index >= 0)
+        routed_values = np.empty((n, 6))
+        routed_values[:] = (FADER_0DB, 0.0, 1.0, FADER_0DB, 1.0, 0.0)
+        routed_values[:, 5] = mplan.fx_value
+        ids.append(mplan.routed_ids[routed].ravel())
+        values.append(routed_values[routed].ravel())
+        positions.append(mplan.routed_pos[routed].ravel())
+
+        # Stage 2, disabled artists: everything at -inf
+        ids.append(mplan.muted_fx_ids[~on].ravel())
+        values.append(np.zeros(mplan.muted_fx_ids[~on].size))
+        positions.append(mplan.muted_fx_pos[~on].ravel())
+
+        # Stage 3: off for everyone when the routed artist is alone, otherwise on at the
+        # summed level for enabled artists on another FX unit
+        alone = (enabled_artists - on) == 0
+        writes = routed[:, None] & mplan.not_self & (alone[:, None] | (on[None, :] & mplan.other_unit))
+        return_values = np.empty((n, n, 2))
+        return_values[:, :, 0] = ~alone[:, None]
+        return_values[:, :, 1] = np.where(alone[:, None], 0.0, mplan.summed_value[None, :])
+        ids.append(mplan.return_ids[writes].ravel())
+        values.append(return_values[writes].ravel())
+        positions.append(mplan.return_pos[writes].ravel())
+
+    if n and mplan.num_instruments:
+        inst_on = np.array([bool(t) for t in instrument_toggles[:mplan.num_instruments]], dtype=bool)
+        on_values = np.empty((mplan.num_instruments, 6))
+        on_values[:] = (FADER_0DB, 0.0, FADER_0DB, 0.0, 1.0, 0.0)
+        on_values[:, 5] = mplan.inst_value
+        off_values = np.array((0.0, 1.0, 0.0, 0.0))
+        ids += [mplan.inst_on_ids[inst_on].ravel(), mplan.inst_off_ids[~inst_on].ravel()]
+        values += [on_values[inst_on].ravel(), np.tile(off_values, int((~inst_on).sum()))]
+        positions += [mplan.inst_on_pos[inst_on].ravel(), mplan.inst_off_pos[~inst_on].ravel()]
+
+    ids = np.concatenate(ids)
+    values = np.concatenate(values)
+    positions = np.concatenate(positions)
+
+    # Keep the last write of every address, then restore generation order
+    last_position = np.full(len(mplan.addresses), -1, dtype=np.int64)
+    np.maximum.at(last_position, ids, positions)
+    final = np.flatnonzero(positions == last_position[ids])
+    final = final[np.argsort(positions[final])]
+    return ids[final], values[final]
+
+
+def generate_matrix_targets(mplan, artist_toggles, instrument_toggles):
+    # The push path (coalescing, console state diff, stages, records) works on address
+    # strings, so the arrays are turned back into (address, value) tuples. At 32/32/32
+    # that is about as long as generate_matrix_state itself.
+    address_ids, values = generate_matrix_state(mplan, artist_toggles, instrument_toggles)
+    return list(zip(mplan.address_array[address_ids].tolist(), values.tolist()))
+
+
+# Matrix plan of the last compiled mix plan
+_matrix_cache = {}
+
+def get_matrix_plan(plan, config, curve):
+    mplan = _matrix_cache.get(id(plan))
+    if mplan is None or mplan.plan is not plan:
+        mplan = MatrixPlan(plan, config, curve)
+        _matrix_cache.clear()
+        _matrix_cache[id(plan)] = mplan
+    return mplan
@@ -0,0 +1,453 @@
+# mix_plan.py
+import threading
+from dataclasses import dataclass
+from osc_manager import db_to_mapped_value
+
+FADER_0DB = 0.76
+
+
+def fader_address(ch_map):
+    return f"/sd/Input_Channels/{ch_map}/fader"
+
+def mute_address(ch_map):
+    return f"/sd/Input_Channels/{ch_map}/mute"
+
+def send_addresses(ch_map, aux_map):
+    # (send_on, send_level) addresses of one aux send
+    prefix = f"/sd/Input_Channels/{ch_map}/Aux_Send/{aux_map}"
+    return (f"{prefix}/send_on", f"{prefix}/send_level")
+
+
+@dataclass(frozen=True)
+class ArtistRecord:
+    ch_map: int
+    aux_map: int
+    fx_unit: int
+    fader: str
+    mute: str
+    co_artist_value: float  # mapped co-artist level
+    fx_value: float         # mapped FX return level
+    summed_value: float     # mapped co-artist + FX level, used for FX returns from other units
+
+
+@dataclass(frozen=True)
+class FxRecord:
+    ch_map: int
+    aux_map: int
+    fader: str
+    mute: str
+
+
+@dataclass(frozen=True)
+class InstrumentRecord:
+    ch_map: int
+    fader: str
+    mute: str
+    send: tuple             # (send_on, send_level) to the instrument's FX unit
+    fx_value: float         # mapped instrument FX level
+
+
+@dataclass(frozen=True)
+class MixPlan:
+    artists: tuple
+    fx_units: tuple
+    instruments: tuple
+    artist_sends: tuple     # artist_sends[i][j]: artist i channel -> artist j aux
+    artist_fx_sends: tuple  # artist_fx_sends[i][k]: artist i channel -> FX unit k aux
+    fx_sends: tuple         # fx_sends[k][j]: FX unit k return -> artist j aux
+    inst_fx: FxRecord       # FX return brought up with a featured instrument (last FX unit)
+
+
+def plan_key(config, curve):
+    # Everything the plan depends on, cheap to build compared to a compile
+    num_toggles = config.get('num_toggles', 1)
+    num_instruments = config.get('num_instruments', 0)
+    num_fx_units = config.get('num_fx_units', 0)
+    key = [num_toggles, num_instruments, num_fx_units, curve, config.get('interpolate_levels', False)]
+    for i in range(1, num_toggles + 1):
+        key.append((config.get(f'ch_map{i}', 0), config.get(f'aux_map{i}', 0),
+                    config.get(f'effects_unit{i}', 0), config.get(f'effects_ref_level{i}', 0.0),
+                    config.get(f'co_artists_ref_level{i}', 0.0)))
+    for k in range(1, num_fx_units + 1):
+        key.append((config.get(f'fx_ch_map{k}', 0), config.get(f'fx_aux_map{k}', 0)))
+    for k in range(1, num_instruments + 1):
+        inst_fx_unit = config.get(f'inst_fx_unit{k}', 0)
+        key.append((config.get(f'inst_ch_map{k}', 0), config.get(f'inst_fx_lvl{k}', 0),
+                    config.get(f'fx_aux_map{inst_fx_unit}', 0)))
+    return tuple(key)
+
+
+def compile_mix_plan(config, curve):
+    num_toggles = config.get('num_toggles', 1)
+    num_instruments = config.get('num_instruments', 0)
+    num_fx_units = config.get('num_fx_units', 0)
+    interpolate = config.get('interpolate_levels', False)
+
+    artists = []
+    for i in range(1, num_toggles + 1):
+        ch_map = config.get(f'ch_map{i}', 0)
+        fx_level = config.get(f'effects_ref_level{i}', 0.0)
+        co_artist_level = config.get(f'co_artists_ref_level{i}', 0.0)
+        artists.append(ArtistRecord(
+            ch_map=ch_map,
+            aux_map=config.get(f'aux_map{i}', 0),
+            fx_unit=config.get(f'effects_unit{i}', 0),
+            fader=fader_address(ch_map),
+            mute=mute_address(ch_map),
+            co_artist_value=db_to_mapped_value(co_artist_level, curve, interpolate),
+            fx_value=db_to_mapped_value(fx_level, curve, interpolate),
+            summed_value=db_to_mapped_value(co_artist_level + fx_level, curve, interpolate),
+        ))
+
+    fx_units = []
+    for k in range(1, num_fx_units + 1):
+        ch_map = config.get(f'fx_ch_map{k}', 0)
+        fx_units.append(FxRecord(ch_map=ch_map, aux_map=config.get(f'fx_aux_map{k}', 0),
+                                 fader=fader_address(ch_map), mute=mute_address(ch_map)))
+
+    instruments = []
+    for k in range(1, num_instruments + 1):
+        ch_map = config.get(f'inst_ch_map{k}', 0)
+        inst_fx_unit = config.get(f'inst_fx_unit{k}', 0)
+        instruments.append(InstrumentRecord(
+            ch_map=ch_map,
+            fader=fader_address(ch_map),
+            mute=mute_address(ch_map),
+            send=send_addresses(ch_map, config.get(f'fx_aux_map{inst_fx_unit}', 0)),
+            fx_value=db_to_mapped_value(config.get(f'inst_fx_lvl{k}', 0), curve, interpolate),
+        ))
+
+    if fx_units:
+        inst_fx = fx_units[-1]
+    else:
+        inst_fx = FxRecord(ch_map=0, aux_map=0, fader=fader_address(0), mute=mute_address(0))
+
+    return MixPlan(
+        artists=tuple(artists),
+        fx_units=tuple(fx_units),
+        instruments=tuple(instruments),
+        artist_sends=tuple(tuple(send_addresses(a.ch_map, b.aux_map) for b in artists) for a in artists),
+        artist_fx_sends=tuple(tuple(send_addresses(a.ch_map, fx.aux_map) for fx in fx_units) for a in artists),
+        fx_sends=tuple(tuple(send_addresses(fx.ch_map, a.aux_map) for a in artists) for fx in fx_units),
+        inst_fx=inst_fx,
+    )
+
+
+# Last compiled plan, recompiled only when the session or mapping changes
+_plan_cache = {}
+
+def get_mix_plan(config, curve):
+    key = plan_key(config, curve)
+    plan = _plan_cache.get(key)
+    if plan is None:
+        plan = compile_mix_plan(config, curve)
+        _plan_cache.clear()
+        _plan_cache[key] = plan
+    return plan
+
+
+def generate_plan_targets(plan, artist_toggles, instrument_toggles):
+    osc_targets = []
+    append = osc_targets.append
+    artists = plan.artists
+    enabled_artists = sum(artist_toggles)
+
+    for i, artist in enumerate(artists):
+        sends = plan.artist_sends[i]
+
+        if artist_toggles[i]:
+            append((artist.fader, FADER_0DB))
+            append((artist.mute, 0))
+
+            # Current artist's channel to every other artist's aux
+            for j, (send_on, send_level) in enumerate(sends):
+                if i != j:
+                    if artist_toggles[j]:
+                        append((send_on, 1))
+                        append((send_level, artist.co_artist_value))
+                    else:
+                        append((send_on, 0))
+                        append((send_level, 0))
+
+            for k, fx in enumerate(plan.fx_units):
+                if artist.fx_unit != k + 1:
+                    continue
+
+                append((fx.fader, FADER_0DB))
+                append((fx.mute, 0))
+
+                # Current artist's channel into the FX unit at 0dB
+                send_on, send_level = plan.artist_fx_sends[i][k]
+                append((send_on, 1))
+                append((send_level, FADER_0DB))
+
+                # FX return to the current artist's aux
+                fx_sends = plan.fx_sends[k]
+                send_on, send_level = fx_sends[i]
+                append((send_on, 1))
+                append((send_level, artist.fx_value))
+
+                if enabled_artists - artist_toggles[i] == 0:
+                    # No other artists enabled: FX return off for every other aux
+                    for j, (send_on, send_level) in enumerate(fx_sends):
+                        if i != j:
+                            append((send_on, 0))
+                            append((send_level, 0))
+                else:
+                    # Enabled artists on a different FX unit hear this return at their summed level
+                    for j, (send_on, send_level) in enumerate(fx_sends):
+                        if i != j and artist_toggles[j] and artists[j].fx_unit != artist.fx_unit:
+                            append((send_on, 1))
+                            append((send_level, artists[j].summed_value))
+
+        else:
+            append((artist.fader, 0))
+            append((artist.mute, 0))
+
+            for j, (send_on, send_level) in enumerate(sends):
+                if i != j:
+                    append((send_on, 0))
+                    append((send_level, 0))
+
+            for k, fx in enumerate(plan.fx_units):
+                # Current artist's channel to FX units, and FX returns to the artist's aux, at -inf dB
+                send_on, send_level = plan.artist_fx_sends[i][k]
+                append((send_on, 0))
+                append((send_level, 0))
+                send_on, send_level = plan.fx_sends[k][i]
+                append((send_on, 0))
+                append((send_level, 0))
+
+        # Featured instruments are emitted alongside every artist
+        for k, inst in enumerate(plan.instruments):
+            send_on, send_level = inst.send
+            if instrument_toggles[k]:
+                append((inst.fader, FADER_0DB))
+                append((inst.mute, 0))
+                append((plan.inst_fx.fader, FADER_0DB))
+                append((plan.inst_fx.mute, 0))
+                append((send_on, 1))
+                append((send_level, inst.fx_value))
+            else:
+                append((inst.fader, 0))
+                append((inst.mute, 1))
+                append((send_on, 0))
+                append((send_level, 0))
+
+    return osc_targets
+
+
+# Incremental regeneration
+#
+# A full generation is an ordered sequence of cells, each keyed by a position
+# tuple (artist, stage, index) that sorts in generation order:
+#   stage 0: artist fader and mute
+#   stage 1: artist -> other artist aux send (index = other artist)
+#   stage 2: artist <-> FX unit block (index = FX unit)
+#   stage 3: FX return -> other artist aux (index = other artist), enabled artists only
+#   stage 4: featured instrument block (index = instrument)
+# A toggle change only touches a few cells. Every address keeps the writes of
+# all cells that set it, and its value is the last write in generation order,
+# so recomputing just the affected cells gives exactly the state of a full run.
+
+class IncrementalGenerator:
+
+    def __init__(self, plan, artist_toggles, instrument_toggles):
+        self.plan = plan
+        self.artist_toggles = list(artist_toggles)
+        self.instrument_toggles = list(instrument_toggles)
+
+        # FX unit index each artist is routed to, None when it matches no unit
+        self.fx_index = []
+        for artist in plan.artists:
+            matches = [k for k in range(len(plan.fx_units)) if artist.fx_unit == k + 1]
+            self.fx_index.append(matches[0] if matches else None)
+
+        self.cells = {}    # cell position -> [(address, value)]
+        self.writers = {}  # address -> {write position: value}
+        self.last = {}     # address -> position of its last write
+        self.stale = set() # Addresses whose last write was erased, recomputed on demand
+        self.enabled_artists = sum(self.artist_toggles)
+        for i in range(len(plan.artists)):
+            for cell in self._segment_cells(i):
+                self._write_cell(cell)
+
+    def _segment_cells(self, i):
+        others = [j for j in range(len(self.plan.artists)) if j != i]
+        cells = [(i, 0, 0)] + [(i, 1, j) for j in others]
+        if self.artist_toggles[i]:
+            k = self.fx_index[i]
+            if k is not None:
+                cells.append((i, 2, k))
+                cells.extend((i, 3, j) for j in others)
+        else:
+            cells.extend((i, 2, k) for k in range(len(self.plan.fx_units)))
+        cells.extend((i, 4, m) for m in range(len(self.plan.instruments)))
+        return cells
+
+    def _cell_targets(self, cell):
+        plan = self.plan
+        artist_toggles = self.artist_toggles
+        i, stage, index = cell
+        artist = plan.artists[i]
+        enabled = artist_toggles[i]
+
+        if stage == 0:
+            return [(artist.fader, FADER_0DB if enabled else 0), (artist.mute, 0)]
+
+        if stage == 1:
+            send_on, send_level = plan.artist_sends[i][index]
+            if enabled and artist_toggles[index]:
+                return [(send_on, 1), (send_level, artist.co_artist_value)]
+            return [(send_on, 0), (send_level, 0)]
+
+        if stage == 2:
+            fx = plan.fx_units[index]
+            artist_fx_on, artist_fx_level = plan.artist_fx_sends[i][index]
+            fx_on, fx_level = plan.fx_sends[index][i]
+            if enabled:
+                return [(fx.fader, FADER_0DB), (fx.mute, 0),
+                        (artist_fx_on, 1), (artist_fx_level, FADER_0DB),
+                        (fx_on, 1), (fx_level, artist.fx_value)]
+            return [(artist_fx_on, 0), (artist_fx_level, 0), (fx_on, 0), (fx_level, 0)]
+
+        if stage == 3:
+            send_on, send_level = plan.fx_sends[self.fx_index[i]][index]
+            if self.enabled_artists - enabled == 0:
+                return [(send_on, 0), (send_level, 0)]
+            other = plan.artists[index]
+            if artist_toggles[index] and other.fx_unit != artist.fx_unit:
+                return [(send_on, 1), (send_level, other.summed_value)]
+            return []
+
+        inst = plan.instruments[index]
+        send_on, send_level = inst.send
+        if self.instrument_toggles[index]:
+            return [(inst.fader, FADER_0DB), (inst.mute, 0),
+                    (plan.inst_fx.fader, FADER_0DB), (plan.inst_fx.mute, 0),
+                    (send_on, 1), (send_level, inst.fx_value)]
+        return [(inst.fader, 0), (inst.mute, 1), (send_on, 0), (send_level, 0)]
+
+    def _write_cell(self, cell, previous_finals=None, targets=None):
+        if targets is None:
+            targets = self._cell_targets(cell)
+        self.cells[cell] = targets
+        for n, (address, value) in enumerate(targets):
+            if previous_finals is not None and address not in previous_finals:
+                previous_finals[address] = self._final(address)
+            position = cell + (n,)
+            self.writers.setdefault(address, {})[position] = value
+            if address not in self.stale:
+                last = self.last.get(address)
+                if last is None or position > last:
+                    self.last[address] = position
+
+    def _erase_cell(self, cell, previous_finals):
+        for n, (address, _) in enumerate(self.cells.pop(cell, ())):
+            if address not in previous_finals:
+                previous_finals[address] = self._final(address)
+            position = cell + (n,)
+            del self.writers[address][position]
+            if self.last.get(address) == position:
+                self.stale.add(address)
+
+    def _final(self, address):
+        # (position, value) of the last write to an address, None if nothing writes it
+        writes = self.writers.get(address)
+        if not writes:
+            return None
+        if address in self.stale:
+            # Only when the last writer itself was erased
+            self.stale.discard(address)
+            self.last[address] = max(writes)
+        position = self.last[address]
+        return position, writes[position]
+
+    def targets(self):
+        # Full generation, identical to generate_plan_targets for the current toggles
+        return [target for cell in sorted(self.cells) for target in self.cells[cell]]
+
+    def update(self, artist_toggles, instrument_toggles):
+        # Switch to new toggles, returning only the (address, value) pairs whose
+        # final value differs from the previous state, in generation order
+        artist_toggles = list(artist_toggles)
+        instrument_toggles = list(instrument_toggles)
+        num_artists = len(self.plan.artists)
+        changed_artists = [i for i in range(num_artists) if artist_toggles[i] != self.artist_toggles[i]]
+        changed_instruments = [m for m in range(len(self.plan.instruments))
+                               if instrument_toggles[m] != self.instrument_toggles[m]]
+        if not changed_artists and not changed_instruments:
+            self.artist_toggles = artist_toggles
+            self.instrument_toggles = instrument_toggles
+            return []
+
+        previous_toggles = self.artist_toggles
+        previous_enabled = self.enabled_artists
+        enabled = sum(artist_toggles)
+
+        # Cells whose inputs changed, besides the whole segment of every toggled artist
+        changed_set = set(changed_artists)
+        dirty = []
+        for i in range(num_artists):
+            if i in changed_set:
+                continue
+            dirty.extend((i, 4, m) for m in changed_instruments)
+            if not artist_toggles[i]:
+                continue
+            dirty.extend((i, 1, j) for j in changed_artists)
+            if self.fx_index[i] is not None:
+                was_alone = previous_enabled - previous_toggles[i] == 0
+                is_alone = enabled - artist_toggles[i] == 0
+                if was_alone != is_alone:
+                    dirty.extend((i, 3, j) for j in range(num_artists) if j != i)
+                else:
+                    dirty.extend((i, 3, j) for j in changed_artists)
+
+        old_cells = [cell for i in changed_artists for cell in self._segment_cells(i)]
+        self.artist_toggles = artist_toggles
+        self.instrument_toggles = instrument_toggles
+        self.enabled_artists = enabled
+        new_cells = [cell for i in changed_artists for cell in self._segment_cells(i)]
+
+        # Final (position, value) of every address touched, taken before it changes.
+        # Only cells whose targets differ are rewritten, e.g. a toggled artist's
+        # instrument cells depend on the instrument toggles alone.
+        previous_finals = {}
+        new_set = set(new_cells)
+        for cell in old_cells:
+            if cell not in new_set:
+                self._erase_cell(cell, previous_finals)
+        for cell in new_cells + dirty:
+            targets = self._cell_targets(cell)
+            if targets != self.cells.get(cell):
+                self._erase_cell(cell, previous_finals)
+                self._write_cell(cell, previous_finals, targets)
+
+        changes = []
+        for address, previous in previous_finals.items():
+            final = self._final(address)
+            if final is not None and (previous is None or previous[1] != final[1]):
+                changes.append((final[0], address, final[1]))
+        changes.sort()
+        return [(address, value) for _, address, value in changes]
+
+_incremental = None
+_incremental_lock = threading.Lock()
+
+def generate_incremental_targets(plan, previous_artist_toggles, previous_instrument_toggles,
+                                 artist_toggles, instrument_toggles):
+    # Targets that changed between two toggle vectors. Falls back to the full
+    # generation when the plan differs from the one of the last incremental run,
+    # since then config edits may have changed any value.
+    global _incremental
+    with _incremental_lock:
+        generator = _incremental
+        if generator is None or generator.plan is not plan:
+            _incremental = IncrementalGenerator(plan, artist_toggles, instrument_toggles)
+            return _incremental.targets()
+
+        if (generator.artist_toggles != list(previous_artist_toggles)
+                or generator.instrument_toggles != list(previous_instrument_toggles)):
+            generator = IncrementalGenerator(plan, previous_artist_toggles, previous_instrument_toggles)
+            _incremental = generator
+        return generator.update(artist_toggles, instrument_toggles)
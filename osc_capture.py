@@ -0,0 +1,113 @@
+# osc_capture.py
+import os
+import mmap
+import atexit
+import time
+import socket
+import struct
+import threading
+
+# Capture file: magic, then one record per datagram:
+#   monotonic timestamp (float64 seconds), direction, IPv4 address, port, length, payload
+CAPTURE_MAGIC = b'OSCCAP1\n'
+RECORD_HEADER = struct.Struct('<dB4sHI')
+OUTBOUND = 0
+INBOUND = 1
+DIRECTION_NAMES = {OUTBOUND: 'out', INBOUND: 'in'}
+
+class CaptureRecord:
+    __slots__ = ('timestamp', 'direction', 'address', 'data')
+
+    def __init__(self, timestamp, direction, address, data):
+        self.timestamp = timestamp
+        self.direction = direction
+        self.address = address
+        self.data = data
+
+
+class OscCapture:
+    # Appends every datagram sent or received to a binary capture file while active.
+    # Writes go through one buffered file under a lock; the hot path only checks `active`.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.file = None
+        self.path = None
+        self.active = False
+        self.datagrams = 0
+        self.bytes = 0
+
+    def start(self, path):
+        with self.lock:
+            if self.active and self.path == path:
+                return
+            self._close()
+            new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+            self.file = open(path, 'ab')
+            if new_file:
+                self.file.write(CAPTURE_MAGIC)
+            self.path = path
+            self.datagrams = 0
+            self.bytes = 0
+            self.active = True
+
+    def stop(self):
+        with self.lock:
+            self._close()
+
+    def flush(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.flush()
+
+    def record(self, direction, address, data):
+        timestamp = time.monotonic()
+        ip, port = address[0], address[1]
+        try:
+            packed_ip = socket.inet_aton(ip)
+        except OSError:
+            packed_ip = bytes(4)  # Hostnames are not resolved here
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(RECORD_HEADER.pack(timestamp, direction, packed_ip, port, len(data)))
+            self.file.write(data)
+            self.datagrams += 1
+            self.bytes += len(data)
+
+    def status(self):
+        with self.lock:
+            return {'active': self.active, 'path': self.path, 'datagrams': self.datagrams, 'bytes': self.bytes}
+
+    def _close(self):
+        self.active = False
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def read_capture(path, direction=None):
+    # Yields CaptureRecords from a memory-mapped capture, only the current payload is copied.
+    # A record cut short by a crash ends the capture.
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size <= len(CAPTURE_MAGIC):
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:len(CAPTURE_MAGIC)] != CAPTURE_MAGIC:
+                raise ValueError(f"Not an OSC capture file: {path}")
+            offset = len(CAPTURE_MAGIC)
+            end = len(data)
+            while offset + RECORD_HEADER.size <= end:
+                timestamp, record_direction, packed_ip, port, size = RECORD_HEADER.unpack_from(data, offset)
+                offset += RECORD_HEADER.size
+                if offset + size > end:
+                    break
+                if direction is None or record_direction == direction:
+                    yield CaptureRecord(timestamp, record_direction, (socket.inet_ntoa(packed_ip), port),
+                                        data[offset:offset + size])
+                offset += size
+
+
+# One capture per process, started and stopped from the setup page or the CLI
+osc_capture = OscCapture()
+atexit.register(osc_capture.stop)
@@ -1,213 +1,375 @@
 # osc_manager.py
 import os
-import json
+import sys
 import struct
-import streamlit as st
-from config_manager import working_directory
+from mapping_service import mapping_service
+from metrics import metrics
+from osc_capture import OUTBOUND, osc_capture
 
-def load_mapping(filename='mapping.json', working_directory=None):
-    mapping_file_path = os.path.join(working_directory, filename) if working_directory else filename
-    try:
-        with open(mapping_file_path, 'r') as f:
-            mapping = json.load(f)
-        return mapping
-    except FileNotFoundError:
-        st.error(f"Failed to load mapping file. Expected location: {mapping_file_path}")
-        return {}
-    
-    
-def db_to_mapped_value(db_value, mapping):
-    db_value_rounded = str(round(db_value))
-    if db_value_rounded in mapping:
-        return mapping[db_value_rounded]
-    else:
-        raise ValueError(f"No mapping found for dB value: {db_value}")
-
-        
-def create_osc_message(address, value):
-    # OSC address pattern, null-terminated and padded to 32-bit boundary
-    address = address.encode('utf-8')
-    address_padded = address + b'\x00' * (4 - (len(address) % 4))
+def db_to_mapped_value(db_value, curve, interpolate=False):
+    # Fader value for a dB level, clamped to the ends of the mapping table
+    return curve.value(db_value, interpolate)
+
+
+# OSC type tag string for a single float argument, null-terminated and padded to 32-bit boundary
+FLOAT_TYPE_TAG = b',f\x00\x00'
+
+# OSC arguments: big-endian 32-bit float and int
+FLOAT_ARG = struct.Struct('>f')
+INT_ARG = struct.Struct('>i')
+
+# Batches at least this large go through the NumPy encoder when NumPy is installed
+VECTORIZE_MIN_BATCH = 64
+
+
+def pad_osc_string(encoded):
+    # Null-terminated and padded to a 32-bit boundary
+    return encoded + b'\x00' * (4 - (len(encoded) % 4))
 
-    # OSC type tag string for a single float argument, null-terminated and padded to 32-bit boundary
-    type_tag = b',f' + b'\x00' * (4 - (2 % 4))  # ",f" is 2 bytes, so pad with 2 null bytes
 
-    # OSC argument: pack the float value into 4 bytes
-    value_packed = struct.pack(">f", value)
+class OscAddressTable:
+    # Interned message headers: the padded address followed by the type tag,
+    # encoded once per address instead of on every push
 
-    # Concatenate the parts to form the complete OSC message
-    message = address_padded + type_tag + value_packed
-    return message
+    def __init__(self):
+        self.headers = {}
+        self.addresses = {}
 
+    def address(self, address):
+        padded = self.addresses.get(address)
+        if padded is None:
+            padded = self.addresses[address] = pad_osc_string(address.encode('utf-8'))
+        return padded
+
+    def header(self, address):
+        header = self.headers.get(address)
+        if header is None:
+            header = self.headers[address] = self.address(address) + FLOAT_TYPE_TAG
+        return header
+
+
+# Shared by every push in the process, the address space is bounded by the session
+address_table = OscAddressTable()
+
+def create_osc_message(address, value):
+    # Concatenate the interned header and the packed float to form the complete OSC message
+    return address_table.header(address) + FLOAT_ARG.pack(value)
+
+
+# A target value is either a plain number, sent as a single float as the console expects,
+# or a tuple of typed arguments: bool -> T/F, int -> i, float -> f, str -> s
+
+def osc_argument(value):
+    # (type tag, encoded argument) for one typed argument
+    if value is True:
+        return 'T', b''
+    if value is False:
+        return 'F', b''
+    if isinstance(value, int):
+        return 'i', INT_ARG.pack(value)
+    if isinstance(value, float):
+        return 'f', FLOAT_ARG.pack(value)
+    if isinstance(value, str):
+        return 's', pad_osc_string(value.encode('utf-8'))
+    raise TypeError(f"Unsupported OSC argument type: {type(value).__name__}")
+
+def osc_type_tags(value):
+    if isinstance(value, tuple):
+        return ''.join(osc_argument(argument)[0] for argument in value)
+    return 'f'
+
+def create_typed_osc_message(address, arguments, table=address_table):
+    # Message with any number of typed arguments
+    tags, data = zip(*map(osc_argument, arguments)) if arguments else ((), ())
+    return table.address(address) + pad_osc_string((',' + ''.join(tags)).encode('ascii')) + b''.join(data)
+
+
+class OscMessage:
+    # One encoded message and the fields it was built from, so nothing downstream
+    # (display, logging, the CLI) has to decode the bytes again
+
+    __slots__ = ('address', 'type_tag', 'value', 'data')
+
+    def __init__(self, address, type_tag, value, data):
+        self.address = address
+        self.type_tag = type_tag
+        self.value = value
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+
+def encode_osc_records(osc_targets, table=address_table):
+    # encode_osc_batch, with an OscMessage per (address, value) pair
+    messages = encode_osc_batch(osc_targets, table)
+    return [OscMessage(address, osc_type_tags(value), value, message)
+            for (address, value), message in zip(osc_targets, messages)]
+
+def encode_osc_batch(osc_targets, table=address_table, vectorize=None):
+    # Encode a whole batch into one contiguous buffer, returning a memoryview per message.
+    # vectorize: None picks the NumPy encoder for large single-float batches once NumPy is loaded.
+    with metrics.stage('encode'):
+        if any(isinstance(value, tuple) for _, value in osc_targets):
+            return encode_typed_batch(osc_targets, table)
+        if vectorize is None:
+            vectorize = len(osc_targets) >= VECTORIZE_MIN_BATCH and numpy_loaded()
+        if vectorize:
+            return encode_float_batch_numpy(osc_targets, table)
+        return encode_float_batch(osc_targets, table)
+
+def encode_float_batch(osc_targets, table=address_table):
+    headers = [table.header(address) for address, _ in osc_targets]
+    buffer = bytearray(sum(map(len, headers)) + FLOAT_ARG.size * len(headers))
+    view = memoryview(buffer)
+    pack_into = FLOAT_ARG.pack_into
+
+    messages = []
+    offset = 0
+    for header, (_, value) in zip(headers, osc_targets):
+        value_offset = offset + len(header)
+        buffer[offset:value_offset] = header
+        pack_into(buffer, value_offset, value)
+        end = value_offset + FLOAT_ARG.size
+        messages.append(view[offset:end])
+        offset = end
+    return messages
+
+def encode_float_batch_numpy(osc_targets, table=address_table):
+    # Same bytes as encode_float_batch. The headers are joined once, then the headers
+    # and all big-endian float arguments are scattered into one buffer by two array writes.
+    import numpy as np
+
+    if not osc_targets:
+        return []
+    addresses = [address for address, _ in osc_targets]
+    headers = list(map(table.headers.get, addresses))
+    if None in headers:
+        headers = list(map(table.header, addresses))
+    lengths = np.fromiter(map(len, headers), dtype=np.int64, count=len(headers)) + FLOAT_ARG.size
+    ends = np.cumsum(lengths)
+    value_offsets = ends - FLOAT_ARG.size
+
+    buffer = np.empty(int(ends[-1]), dtype=np.uint8)
+    value_slots = (value_offsets[:, None] + np.arange(FLOAT_ARG.size)).ravel()
+    header_mask = np.ones(buffer.size, dtype=bool)
+    header_mask[value_slots] = False
+    buffer[header_mask] = np.frombuffer(b''.join(headers), dtype=np.uint8)
+    values = np.array([value for _, value in osc_targets], dtype='>f4')
+    buffer[value_slots] = values.view(np.uint8)
+
+    view = memoryview(buffer.data).cast('B')
+    starts = (ends - lengths).tolist()
+    return [view[start:end] for start, end in zip(starts, ends.tolist())]
+
+def encode_typed_batch(osc_targets, table=address_table):
+    # Mixed batches: single floats and typed argument tuples, joined into one buffer
+    encoded = [create_typed_osc_message(address, value, table) if isinstance(value, tuple)
+               else table.header(address) + FLOAT_ARG.pack(value)
+               for address, value in osc_targets]
+    view = memoryview(b''.join(encoded))
+    messages = []
+    offset = 0
+    for message in encoded:
+        messages.append(view[offset:offset + len(message)])
+        offset += len(message)
+    return messages
+
+
+def numpy_loaded():
+    # The NumPy encoder is only picked when NumPy is already imported (Streamlit, the
+    # matrix backend), so a one-shot push such as cli.py never pays for the import
+    return 'numpy' in sys.modules
+
+
+def load_curve(working_directory=None):
+    # The mapping is parsed once and reloaded only when mapping.json changes
+    curve = mapping_service.get_curve('mapping.json', working_directory)
+    if curve is None:
+        mapping_file_path = os.path.join(working_directory, 'mapping.json') if working_directory else 'mapping.json'
+        raise FileNotFoundError(f"Failed to load mapping file. Expected location: {mapping_file_path}")
+    return curve
+
+def generate_osc_targets(config, artist_toggles, instrument_toggles, working_directory=None):
+    from mix_plan import get_mix_plan, generate_plan_targets
+
+    curve = load_curve(working_directory)
+
+    # Target console state as an ordered list of (address, value) pairs,
+    # generated from the plan compiled once per session/mapping change
+    with metrics.stage('generate'):
+        plan = get_mix_plan(config, curve)
+        if config.get('matrix_backend', False):
+            # Vectorized backend: the same console state, reduced to one write per address
+            from mix_matrix import get_matrix_plan, generate_matrix_targets
+            return generate_matrix_targets(get_matrix_plan(plan, config, curve), artist_toggles, instrument_toggles)
+        return generate_plan_targets(plan, artist_toggles, instrument_toggles)
+
+def generate_osc_target_changes(config, previous_artist_toggles, previous_instrument_toggles,
+                                artist_toggles, instrument_toggles, working_directory=None):
+    from mix_plan import get_mix_plan, generate_incremental_targets
+
+    curve = load_curve(working_directory)
+
+    # Only the (address, value) pairs whose value differs from the previous toggle state
+    with metrics.stage('generate'):
+        plan = get_mix_plan(config, curve)
+        return generate_incremental_targets(plan, previous_artist_toggles, previous_instrument_toggles,
+                                            artist_toggles, instrument_toggles)
+
+def coalesce_osc_targets(osc_targets):
+    # Last writer wins: keep the final value of every address, ordered by its last
+    # write with mutes first. Returns (coalesced targets, number of messages removed).
+    final_values = {}
+    for address, value in reversed(osc_targets):
+        if address not in final_values:
+            final_values[address] = value
+    ordered = list(final_values.items())
+    ordered.reverse()
+
+    mutes = [target for target in ordered if target[0].endswith('/mute')]
+    others = [target for target in ordered if not target[0].endswith('/mute')]
+    return mutes + others, len(osc_targets) - len(ordered)
 
 def generate_osc_messages(config, artist_toggles, instrument_toggles, working_directory=None):
-    osc_messages = []
-    num_toggles = config.get('num_toggles', 1)
-    num_instruments = config.get('num_instruments', 0)
-    num_fx_units = config.get('num_fx_units', 0)
-
-    # Load the mapping from mapping.json
-    mapping = load_mapping('mapping.json', working_directory)
-    if mapping:
-        pass  # Mapping file loaded successfully
-    else:
-        mapping_file_path = os.path.join(working_directory, 'mapping.json')
-        st.error(f"Failed to load mapping file. Expected location: {mapping_file_path}")
-
-    for i in range(num_toggles):
-        artist_name = config.get(f'name{i+1}', '')
-        ch_map = config.get(f'ch_map{i+1}', 0)
-        fx_unit = config.get(f'effects_unit{i+1}', 0)
-        fx_level = config.get(f'effects_ref_level{i+1}', 0.0)
-        co_artist_level = config.get(f'co_artists_ref_level{i+1}', 0.0)
-        aux_map = config.get(f'aux_map{i+1}', 0)
-
-        if artist_toggles[i]:  # If artist toggle is enabled
-            # Set artist ch_map fader to 0dB (0.76)
-            osc_messages.append(create_osc_message(f"/sd/Input_Channels/{ch_map}/fader", 0.76))
-
-            # Set artist ch_map mute to 0 (unmuted)
-            osc_messages.append(create_osc_message(f"/sd/Input_Channels/{ch_map}/mute", 0))
-
-            for j in range(num_toggles):
-                if i != j:  # Skip the current artist
-                    other_ch_map = config.get(f'ch_map{j+1}', 0)
-                    other_fx_unit = config.get(f'effects_unit{j+1}', 0)
-                    other_fx_level = config.get(f'effects_ref_level{j+1}', 0.0)
-                    other_co_artist_level = config.get(f'co_artists_ref_level{j+1}', 0.0)
-                    other_aux_map = config.get(f'aux_map{j+1}', 0)
-
-                    if artist_toggles[j]:  # If other artist toggle is enabled
-                        # Send current artist's channel to other enabled artist's aux at the specified co-artist level
-                        mapped_co_artist_level = db_to_mapped_value(co_artist_level, mapping)
-                        osc_messages.append(create_osc_message(f"/sd/Input_Channels/{ch_map}/Aux_Send/{other_aux_map}/send_on", 1))
-                        osc_messages.append(create_osc_message(f"/sd/Input_Channels/{ch_map}/Aux_Send/{other_aux_map}/send_level", mapped_co_artist_level))
-                    else:  # If other artist toggle is disabled
-                        # Send current artist's channel to other disabled artist's aux at -inf dB
-                        osc_messages.append(create_osc_message(f"/sd/Input_Channels/{ch_map}/Aux_Send/{other_aux_map}/send_on", 0))
-                        osc_messages.append(create_osc_message(f"/sd/Input_Channels/{ch_map}/Aux_Send/{other_aux_map}/send_level", 0))
-
-            for k in range(num_fx_units):
-                fx_unit_name = config.get(f'fx_unit{k+1}', '')
-                fx_ch_map = config.get(f'fx_ch_map{k+1}', 0)
-                fx_aux_map = config.get(f'fx_aux_map{k+1}', 0)
-
-                if fx_unit == k+1:  # If FX unit matches the artist's FX unit
-                    # Set FX unit channel map fader to 0dB (0.76)
-                    osc_messages.append(create_osc_message(f"/sd/Input_Channels/{fx_ch_map}/fader", 0.76))
-
-                    # Set FX unit channel map mute to 0 (unmuted)
-                    osc_messages.append(create_osc_message(f"/sd/Input_Channels/{fx_ch_map}/mute", 0))
-
-                    # Send current artist's channel to FX unit at 0dB
-                    osc_messages.append(create_osc_message(f"/sd/Input_Channels/{ch_map}/Aux_Send/{fx_aux_map}/send_on", 1))
-                    osc_messages.append(create_osc_message(f"/sd/Input_Channels/{ch_map}/Aux_Send/{fx_aux_map}/send_level", 0.76))
-
-                    # Send FX unit to current artist's aux at the specified FX level
-                    mapped_fx_level = db_to_mapped_value(fx_level, mapping)
-                    osc_messages.append(create_osc_message(f"/sd/Input_Channels/{fx_ch_map}/Aux_Send/{aux_map}/send_on", 1))
-                    osc_messages.append(create_osc_message(f"/sd/Input_Channels/{fx_ch_map}/Aux_Send/{aux_map}/send_level", mapped_fx_level))
-
-                    other_enabled_artists = sum(artist_toggles) - artist_toggles[i]
-                    if other_enabled_artists == 0:  # If no other artists are enabled
-                        for j in range(num_toggles):
-                            if i != j:  # Skip the current artist
-                                other_aux_map = config.get(f'aux_map{j+1}', 0)
-                                # Turn off FX unit send to other artists' auxes
-                                osc_messages.append(create_osc_message(f"/sd/Input_Channels/{fx_ch_map}/Aux_Send/{other_aux_map}/send_on", 0))
-                                osc_messages.append(create_osc_message(f"/sd/Input_Channels/{fx_ch_map}/Aux_Send/{other_aux_map}/send_level", 0))
-                    else:
-                        for j in range(num_toggles):
-                            if i != j and artist_toggles[j]:  # If other artist is enabled
-                                other_aux_map = config.get(f'aux_map{j+1}', 0)
-                                other_fx_unit = config.get(f'effects_unit{j+1}', 0)
-                                other_fx_level = config.get(f'effects_ref_level{j+1}', 0.0)
-                                other_co_artist_level = config.get(f'co_artists_ref_level{j+1}', 0.0)
-
-                                if config.get(f'effects_unit{j+1}', 0) != fx_unit:  # Check for different FX units
-                                    # Sum of other artist's co-artist level for current artist + other artist's FX level
-                                    summed_level = other_co_artist_level + other_fx_level
-                                    mapped_summed_level = db_to_mapped_value(summed_level, mapping)
-                                    osc_messages.append(create_osc_message(f"/sd/Input_Channels/{fx_ch_map}/Aux_Send/{other_aux_map}/send_on", 1))
-                                    osc_messages.append(create_osc_message(f"/sd/Input_Channels/{fx_ch_map}/Aux_Send/{other_aux_map}/send_level", mapped_summed_level))
-
-                else:  # If FX unit doesn't match the artist's FX unit
-                    if not artist_toggles[i]:  # If artist toggle is disabled
-                        # Send FX unit to current artist's aux at -inf dB
-                        osc_messages.append(create_osc_message(f"/sd/Input_Channels/{fx_ch_map}/Aux_Send/{aux_map}/send_on", 0))
-                        osc_messages.append(create_osc_message(f"/sd/Input_Channels/{fx_ch_map}/Aux_Send/{aux_map}/send_level", 0))
-
-        else:  # If artist toggle is disabled
-            # Set artist ch_map fader to -inf dB (0)
-            osc_messages.append(create_osc_message(f"/sd/Input_Channels/{ch_map}/fader", 0))
-
-            # Set artist ch_map mute to 0 (unmuted)
-            osc_messages.append(create_osc_message(f"/sd/Input_Channels/{ch_map}/mute", 0))
-
-            for j in range(num_toggles):
-                if i != j:  # Skip the current artist
-                    other_ch_map = config.get(f'ch_map{j+1}', 0)
-                    other_aux_map = config.get(f'aux_map{j+1}', 0)
-
-                    # Send current artist's channel to other artists' auxes at -inf dB
-                    osc_messages.append(create_osc_message(f"/sd/Input_Channels/{ch_map}/Aux_Send/{other_aux_map}/send_on", 0))
-                    osc_messages.append(create_osc_message(f"/sd/Input_Channels/{ch_map}/Aux_Send/{other_aux_map}/send_level", 0))
-
-            for k in range(num_fx_units):
-                fx_ch_map = config.get(f'fx_ch_map{k+1}', 0)
-                fx_aux_map = config.get(f'fx_aux_map{k+1}', 0)
-
-                # Send current artist's channel to FX units at -inf dB
-                osc_messages.append(create_osc_message(f"/sd/Input_Channels/{ch_map}/Aux_Send/{fx_aux_map}/send_on", 0))
-                osc_messages.append(create_osc_message(f"/sd/Input_Channels/{ch_map}/Aux_Send/{fx_aux_map}/send_level", 0))
-
-                # Send FX units to current artist's aux at -inf dB
-                osc_messages.append(create_osc_message(f"/sd/Input_Channels/{fx_ch_map}/Aux_Send/{aux_map}/send_on", 0))
-                osc_messages.append(create_osc_message(f"/sd/Input_Channels/{fx_ch_map}/Aux_Send/{aux_map}/send_level", 0))
-        
-        # Featured Instruments OSC Logic
-        for i in range(num_instruments):
-            inst_ch_map = config.get(f'inst_ch_map{i+1}', 0)
-            inst_fx_unit = config.get(f'inst_fx_unit{i+1}', 0)
-            inst_fx_lvl = config.get(f'inst_fx_lvl{i+1}', 0)
-            fx_aux_map = config.get(f'fx_aux_map{inst_fx_unit}', 0)
-
-            if instrument_toggles[i]:  # If the featured instrument toggle is on
-                # Set instrument channel fader to 0dB (0.76)
-                osc_messages.append(create_osc_message(f"/sd/Input_Channels/{inst_ch_map}/fader", 0.76))
-
-                # Set instrument channel mute to 0 (unmuted)
-                osc_messages.append(create_osc_message(f"/sd/Input_Channels/{inst_ch_map}/mute", 0))
-                
-                # Set FX unit channel map fader to 0dB (0.76)
-                osc_messages.append(create_osc_message(f"/sd/Input_Channels/{fx_ch_map}/fader", 0.76))
-
-                # Set FX unit channel map mute to 0 (unmuted)
-                osc_messages.append(create_osc_message(f"/sd/Input_Channels/{fx_ch_map}/mute", 0))
-
-                # Send instrument channel to FX unit at the specified level
-                mapped_inst_fx_lvl = db_to_mapped_value(inst_fx_lvl, mapping)
-                osc_messages.append(create_osc_message(f"/sd/Input_Channels/{inst_ch_map}/Aux_Send/{fx_aux_map}/send_on", 1))
-                osc_messages.append(create_osc_message(f"/sd/Input_Channels/{inst_ch_map}/Aux_Send/{fx_aux_map}/send_level", mapped_inst_fx_lvl))
-
-            else:  # If the featured instrument toggle is off
-                # Set instrument channel fader to -inf dB (0)
-                osc_messages.append(create_osc_message(f"/sd/Input_Channels/{inst_ch_map}/fader", 0))
-
-                # Set instrument channel mute to 1 (muted)
-                osc_messages.append(create_osc_message(f"/sd/Input_Channels/{inst_ch_map}/mute", 1))
-
-                # Turn off the send from the instrument channel to FX unit
-                osc_messages.append(create_osc_message(f"/sd/Input_Channels/{inst_ch_map}/Aux_Send/{fx_aux_map}/send_on", 0))
-                osc_messages.append(create_osc_message(f"/sd/Input_Channels/{inst_ch_map}/Aux_Send/{fx_aux_map}/send_level", 0))
-
-    return osc_messages
-
-def send_osc_batch(ip, port, messages):
+    osc_targets = generate_osc_targets(config, artist_toggles, instrument_toggles, working_directory)
+    return encode_osc_batch(osc_targets)
+
+def read_osc_string(data, offset):
+    # Null-terminated string padded to a 32-bit boundary, returns (string, next offset)
+    end = data.index(b'\x00', offset)
+    return data[offset:end].decode('utf-8', errors='replace'), end + 4 - (end % 4)
+
+def decode_osc_message(data):
+    # (address, [arguments]) of a single OSC message
+    address, offset = read_osc_string(data, 0)
+    if offset >= len(data):
+        return address, []  # Older senders may omit the type tag string entirely
+    type_tags, offset = read_osc_string(data, offset)
+
+    arguments = []
+    for tag in type_tags[1:]:
+        if tag == 'f':
+            arguments.append(FLOAT_ARG.unpack_from(data, offset)[0])
+            offset += 4
+        elif tag == 'i':
+            arguments.append(struct.unpack_from('>i', data, offset)[0])
+            offset += 4
+        elif tag == 's':
+            value, offset = read_osc_string(data, offset)
+            arguments.append(value)
+        elif tag == 'T':
+            arguments.append(True)
+        elif tag == 'F':
+            arguments.append(False)
+        elif tag == 'N':
+            arguments.append(None)
+        elif tag == 'd':
+            arguments.append(struct.unpack_from('>d', data, offset)[0])
+            offset += 8
+        elif tag == 'h':
+            arguments.append(struct.unpack_from('>q', data, offset)[0])
+            offset += 8
+        elif tag == 'b':
+            (size,) = struct.unpack_from('>i', data, offset)
+            arguments.append(bytes(data[offset + 4:offset + 4 + size]))
+            offset += 4 + size + (-size % 4)
+        else:
+            raise ValueError(f"Unsupported OSC type tag '{tag}' in message to {address}")
+    return address, arguments
+
+def decode_osc_packet(data):
+    # List of (address, [arguments]) for a message or an (optionally nested) bundle
+    data = bytes(data)
+    if not data.startswith(b'#bundle\x00'):
+        return [decode_osc_message(data)]
+
+    messages = []
+    offset = 16  # "#bundle" string and time tag
+    while offset + 4 <= len(data):
+        (size,) = struct.unpack_from('>i', data, offset)
+        offset += 4
+        messages.extend(decode_osc_packet(data[offset:offset + size]))
+        offset += size
+    return messages
+
+
+# OSC bundle header: "#bundle" string followed by the "immediately" time tag
+BUNDLE_HEADER = b'#bundle\x00' + struct.pack('>Q', 1)
+BUNDLE_ELEMENT_SIZE = struct.Struct('>i')
+
+# Largest UDP payload that fits a standard Ethernet frame without fragmentation
+DEFAULT_MTU = 1472
+
+def pack_osc_bundles(messages, mtu=DEFAULT_MTU):
+    # Greedily pack messages into bundles no larger than the MTU, yielding
+    # (datagram, message_count). A message that fits no bundle is sent on its own.
+    element_overhead = BUNDLE_ELEMENT_SIZE.size
+    parts = []
+    count = 0
+    size = len(BUNDLE_HEADER)
+
+    for message in messages:
+        element_size = element_overhead + len(message)
+        if count and size + element_size > mtu:
+            yield (b''.join(parts) if count > 1 else parts[-1]), count
+            parts = []
+            count = 0
+            size = len(BUNDLE_HEADER)
+
+        if size + element_size > mtu:
+            yield message, 1
+            continue
+
+        if not count:
+            parts.append(BUNDLE_HEADER)
+        parts.append(BUNDLE_ELEMENT_SIZE.pack(len(message)))
+        parts.append(message)
+        count += 1
+        size += element_size
+
+    if count:
+        yield (b''.join(parts) if count > 1 else parts[-1]), count
+
+
+def build_datagrams(messages, bundle=False, mtu=DEFAULT_MTU):
+    # List of (datagram, message_count) ready for sendto
+    if bundle:
+        return list(pack_osc_bundles(messages, mtu))
+    # One message per datagram, for consoles that reject bundles
+    return [(message, 1) for message in messages]
+
+def datagram_stats(datagrams):
+    stats = {'messages': 0, 'bundles': 0, 'datagrams': len(datagrams), 'bytes': 0}
+    for datagram, count in datagrams:
+        stats['messages'] += count
+        stats['bytes'] += len(datagram)
+        if count > 1:
+            stats['bundles'] += 1
+    return stats
+
+
+def send_osc_batch(ip, port, messages, bundle=False, mtu=DEFAULT_MTU):
     import socket
+    datagrams = build_datagrams(messages, bundle, mtu)
+
+    stats = datagram_stats(datagrams)
+
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     try:
-        for message in messages:
-            sock.sendto(message, (ip, int(port)))
+        destination = (ip, int(port))
+        with metrics.stage('send'):
+            for datagram, _ in datagrams:
+                sock.sendto(datagram, destination)
+                if osc_capture.active:
+                    osc_capture.record(OUTBOUND, destination, datagram)
+    except OSError:
+        metrics.count('send_errors')
+        raise
     finally:
-        sock.close() 
\ No newline at end of file
+        sock.close()
+
+    metrics.count('messages', stats['messages'])
+    metrics.count('datagrams', stats['datagrams'])
+    metrics.count('bytes', stats['bytes'])
+    return stats
@@ -0,0 +1,106 @@
+# osc_receiver.py
+import time
+import socket
+import struct
+import logging
+import threading
+from osc_manager import decode_osc_packet
+from osc_capture import INBOUND, osc_capture
+
+class ConsoleMirror:
+    # Last value the console reported for each OSC address
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+        self.updated_at = {}
+        self.packets = 0
+        self.messages = 0
+        self.decode_errors = 0
+
+    def update(self, decoded_messages, received_at):
+        with self.lock:
+            self.packets += 1
+            for address, arguments in decoded_messages:
+                self.values[address] = arguments[0] if len(arguments) == 1 else tuple(arguments)
+                self.updated_at[address] = received_at
+                self.messages += 1
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.values)
+
+    def observations(self):
+        # {address: (value, monotonic receive time)}, for ConsoleState.diff
+        with self.lock:
+            return {address: (value, self.updated_at[address]) for address, value in self.values.items()}
+
+    def status(self):
+        with self.lock:
+            return {
+                'addresses': len(self.values),
+                'packets': self.packets,
+                'messages': self.messages,
+                'decode_errors': self.decode_errors,
+            }
+
+
+class OscReceiver:
+    # Background listener on the configured receive port, decoding everything the
+    # console sends into a ConsoleMirror. Any local UDP sender can stand in for the desk.
+
+    def __init__(self, port, mirror=None, host='0.0.0.0', buffer_size=65535):
+        self.port = int(port)
+        self.mirror = mirror if mirror is not None else ConsoleMirror()
+        self.buffer = bytearray(buffer_size)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, self.port))
+        self.sock.settimeout(0.5)
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name=f"osc-receiver-{self.port}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+        self.sock.close()
+
+    def _run(self):
+        view = memoryview(self.buffer)
+        while self.running:
+            try:
+                size, peer = self.sock.recvfrom_into(self.buffer)
+            except socket.timeout:
+                continue
+            except OSError as e:
+                logging.error(f"OSC receive on port {self.port} failed: {e}")
+                continue
+
+            received_at = time.monotonic()
+            if osc_capture.active:
+                osc_capture.record(INBOUND, peer, view[:size])
+            try:
+                decoded_messages = decode_osc_packet(view[:size])
+            except (ValueError, IndexError, struct.error) as e:
+                with self.mirror.lock:
+                    self.mirror.decode_errors += 1
+                logging.warning(f"Dropped undecodable OSC packet on port {self.port}: {e}")
+                continue
+            self.mirror.update(decoded_messages, received_at)
+
+
+# One mirror per process; the receiver is restarted when the receive port changes
+console_mirror = ConsoleMirror()
+_receiver = None
+_receiver_lock = threading.Lock()
+
+def get_osc_receiver(port):
+    global _receiver
+    with _receiver_lock:
+        if _receiver is not None and _receiver.port != int(port):
+            _receiver.stop()
+            _receiver = None
+        if _receiver is None:
+            _receiver = OscReceiver(port, console_mirror)
+        return _receiver
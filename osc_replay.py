@@ -0,0 +1,138 @@
+# osc_replay.py
+#
+# Resend a capture written by osc_capture to reproduce show traffic under load.
+#
+#   python osc_replay.py osc_capture.osccap --to 192.168.1.50:8000          # original timing
+#   python osc_replay.py osc_capture.osccap --to 127.0.0.1:9000 --speed 4   # four times as fast
+#   python osc_replay.py osc_capture.osccap --speed max --loopback          # flat out, loss counted locally
+import sys
+import time
+import socket
+import argparse
+import threading
+from osc_capture import DIRECTION_NAMES, read_capture
+
+class ReceiveCounter:
+    # Counts datagrams arriving on a local port, for loss measured on this machine
+
+    def __init__(self, host='127.0.0.1'):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, 0))
+        self.sock.settimeout(0.1)
+        self.address = self.sock.getsockname()
+        self.datagrams = 0
+        self.bytes = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="replay-counter", daemon=True)
+        self.thread.start()
+
+    def stop(self, settle=0.2):
+        # Give datagrams still in the socket buffer time to be counted
+        time.sleep(settle)
+        self.running = False
+        self.thread.join()
+        self.sock.close()
+
+    def _run(self):
+        buffer = bytearray(65535)
+        while self.running:
+            try:
+                size = self.sock.recv_into(buffer)
+            except socket.timeout:
+                continue
+            self.datagrams += 1
+            self.bytes += size
+
+
+def replay(records, target, speed=1.0):
+    # Sends each record's payload to target. speed scales the captured gaps (2.0 is twice
+    # as fast), None sends back to back. Returns counters and the achieved rates.
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sent = errors = sent_bytes = 0
+    max_lag = 0.0
+    first_timestamp = None
+    start = time.perf_counter()
+    try:
+        for record in records:
+            if speed:
+                if first_timestamp is None:
+                    first_timestamp = record.timestamp
+                deadline = start + (record.timestamp - first_timestamp) / speed
+                delay = deadline - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    max_lag = max(max_lag, -delay)
+            try:
+                sock.sendto(record.data, target)
+            except OSError:
+                errors += 1
+                continue
+            sent += 1
+            sent_bytes += len(record.data)
+    finally:
+        sock.close()
+
+    duration = time.perf_counter() - start
+    return {'sent': sent, 'send_errors': errors, 'bytes': sent_bytes, 'duration': duration, 'max_lag': max_lag,
+            'datagrams_per_second': sent / duration if duration > 0 else 0.0,
+            'bytes_per_second': sent_bytes / duration if duration > 0 else 0.0}
+
+
+def parse_speed(text):
+    if text.lower() in ('max', '0'):
+        return None
+    speed = float(text.lower().rstrip('x'))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError(f"Invalid speed: {text}")
+    return speed
+
+def parse_target(text):
+    ip, _, port = text.rpartition(':')
+    if not ip or not port.isdigit():
+        raise argparse.ArgumentTypeError(f"Expected IP:PORT, got {text}")
+    return ip, int(port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a binary OSC capture and report throughput and loss.")
+    parser.add_argument('capture', help="capture file written by the app or cli.py --capture")
+    parser.add_argument('--to', type=parse_target, metavar='IP:PORT', help="replay target, e.g. the console")
+    parser.add_argument('--loopback', action='store_true',
+                        help="replay to a local port opened by this tool and count what arrives")
+    parser.add_argument('--speed', type=parse_speed, default=1.0, metavar='N|max',
+                        help="1 for the captured timing, N times as fast, or max (default: 1)")
+    parser.add_argument('--direction', choices=('out', 'in', 'all'), default='out',
+                        help="which captured datagrams to resend (default: out)")
+    args = parser.parse_args(argv)
+    if bool(args.to) == args.loopback:
+        parser.error("Pass either --to or --loopback")
+
+    direction = None if args.direction == 'all' else {name: d for d, name in DIRECTION_NAMES.items()}[args.direction]
+    counter = ReceiveCounter() if args.loopback else None
+    target = counter.address if counter else args.to
+    try:
+        stats = replay(read_capture(args.capture, direction), target, args.speed)
+    except (OSError, ValueError) as e:
+        parser.exit(2, f"{parser.prog}: error: {e}\n")
+    finally:
+        if counter:
+            counter.stop()
+
+    print(f"{stats['sent']} datagrams, {stats['bytes']} bytes to {target[0]}:{target[1]} in "
+          f"{stats['duration']:.3f} s ({'max' if args.speed is None else f'{args.speed:g}x'} speed)")
+    print(f"  throughput {stats['datagrams_per_second']:.0f} datagrams/s, "
+          f"{stats['bytes_per_second'] / 1e6:.2f} MB/s; max lag behind schedule {stats['max_lag'] * 1000:.2f} ms")
+    # Without --loopback only send errors are visible here, drops at the target are not
+    lost = stats['send_errors']
+    if counter:
+        lost += stats['sent'] - counter.datagrams
+        print(f"  received {counter.datagrams} datagrams")
+    attempted = stats['sent'] + stats['send_errors']
+    print(f"  send errors {stats['send_errors']}, lost {lost} "
+          f"({lost / attempted * 100 if attempted else 0.0:.2f}%)")
+    if lost:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
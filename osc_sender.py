@@ -0,0 +1,289 @@
+# osc_sender.py
+import time
+import queue
+import select
+import socket
+import logging
+import threading
+from metrics import metrics
+from osc_capture import OUTBOUND, osc_capture
+from osc_manager import DEFAULT_MTU, build_datagrams, datagram_stats
+
+class Delivery:
+    # Progress of one push to one destination
+
+    __slots__ = ('address', 'pacing_rate', 'sent', 'position', 'bytes', 'next_send', 'error', 'drain_time')
+
+    def __init__(self, ip, port, pacing_rate=0):
+        self.address = (ip, int(port))
+        self.pacing_rate = pacing_rate or 0
+        self.sent = 0
+        self.position = 0
+        self.bytes = 0
+        self.next_send = 0.0
+        self.error = None
+        self.drain_time = None
+
+    @property
+    def name(self):
+        return f"{self.address[0]}:{self.address[1]}"
+
+def make_deliveries(destinations, pacing_rate=0):
+    # destinations are (ip, port) or (ip, port, pacing_rate) tuples
+    return [Delivery(ip, port, rest[0] if rest and rest[0] is not None else pacing_rate)
+            for ip, port, *rest in destinations]
+
+def deliver(sock, datagrams, deliveries, on_sent=None, start=None):
+    # Every datagram to every destination over one non-blocking socket. Destinations are
+    # interleaved so the push takes about as long as the slowest single destination;
+    # each keeps its own pacing deadline, and an error stops only that destination
+    # (for the rest of the push, when a push is sent in stages).
+    now = time.perf_counter()
+    start = now if start is None else start
+    active = [delivery for delivery in deliveries if datagrams and delivery.error is None]
+    for delivery in active:
+        delivery.next_send = max(delivery.next_send, now)
+        delivery.position = 0
+
+    while active:
+        now = time.perf_counter()
+        next_deadline = None
+        blocked = progressed = False
+        for delivery in list(active):
+            if delivery.next_send > now:
+                next_deadline = delivery.next_send if next_deadline is None else min(next_deadline, delivery.next_send)
+                continue
+
+            datagram = datagrams[delivery.position][0]
+            try:
+                sock.sendto(datagram, delivery.address)
+            except BlockingIOError:
+                blocked = True
+                continue
+            except OSError as e:
+                delivery.error = e
+                delivery.drain_time = time.perf_counter() - start
+                active.remove(delivery)
+                continue
+
+            if osc_capture.active:
+                osc_capture.record(OUTBOUND, delivery.address, datagram)
+            progressed = True
+            delivery.position += 1
+            delivery.sent += 1
+            delivery.bytes += len(datagram)
+            if on_sent:
+                on_sent(delivery)
+            if delivery.pacing_rate > 0:
+                # Deadline-based pacing keeps the average rate even when a sleep overshoots
+                delivery.next_send += 1.0 / delivery.pacing_rate
+            if delivery.position == len(datagrams):
+                delivery.drain_time = time.perf_counter() - start
+                active.remove(delivery)
+
+        if blocked:
+            # Socket buffer full: wait until it drains instead of spinning
+            select.select([], [sock], [], 0.05)
+        elif not progressed and next_deadline is not None:
+            delay = next_deadline - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    return deliveries
+
+def send_osc_fanout(destinations, messages, bundle=False, mtu=DEFAULT_MTU, pacing_rate=0):
+    # Synchronous fan-out for one-shot callers such as the CLI. Failed destinations are
+    # reported in stats['destinations'] rather than raised.
+    return send_osc_stages(destinations, [messages], bundle, mtu, pacing_rate=pacing_rate)
+
+def send_osc_stages(destinations, stage_messages, bundle=False, mtu=DEFAULT_MTU, gap=0.0, pacing_rate=0):
+    # send_osc_fanout for a push split into priority stages, `gap` seconds apart
+    stages = [build_datagrams(messages, bundle, mtu) for messages in stage_messages]
+    stats = datagram_stats([datagram for datagrams in stages for datagram in datagrams])
+    deliveries = make_deliveries(destinations, pacing_rate)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setblocking(False)
+    try:
+        with metrics.stage('send'):
+            stats.update(deliver_stages(sock, stages, deliveries, gap))
+    finally:
+        sock.close()
+
+    record_deliveries(stats, deliveries)
+    return stats
+
+def deliver_stages(sock, stages, deliveries, gap=0.0, on_sent=None, start=None):
+    # Stages go out in order with `gap` seconds between them. Returns the time until the
+    # first non-empty stage was on the wire (the first audible change) and the total time.
+    start = time.perf_counter() if start is None else start
+    first_audible = None
+    sent_any = False
+    for datagrams in stages:
+        if not datagrams:
+            continue
+        if sent_any and gap > 0:
+            time.sleep(gap)
+        deliver(sock, datagrams, deliveries, on_sent, start)
+        sent_any = True
+        if first_audible is None:
+            first_audible = time.perf_counter() - start
+    push_time = time.perf_counter() - start
+    if sent_any:
+        metrics.record('first_audible', first_audible)
+        metrics.record('push_total', push_time)
+    return {'first_audible': first_audible, 'push_time': push_time}
+
+def record_deliveries(stats, deliveries):
+    # Push counters, plus per-destination results under stats['destinations']
+    stats['destinations'] = {delivery.name: {'datagrams': delivery.sent, 'bytes': delivery.bytes,
+                                             'error': delivery.error, 'drain_time': delivery.drain_time}
+                             for delivery in deliveries}
+    metrics.count('messages', stats['messages'])
+    metrics.count('datagrams', sum(delivery.sent for delivery in deliveries))
+    metrics.count('bytes', sum(delivery.bytes for delivery in deliveries))
+    metrics.count('send_errors', sum(1 for delivery in deliveries if delivery.error))
+    return stats
+
+
+class SendJob:
+    # One queued push: its datagrams, one delivery per destination, and drain timing once sent
+
+    def __init__(self, deliveries, stages, on_error=None, gap=0.0):
+        self.deliveries = deliveries
+        self.stages = stages
+        self.datagrams = [datagram for datagrams in stages for datagram in datagrams]
+        self.gap = gap
+        self.stats = datagram_stats(self.datagrams)
+        self.on_error = on_error
+        self.queued_at = time.perf_counter()
+        self.drain_time = None
+        self.error = None
+        self.done = threading.Event()
+
+    @property
+    def sent(self):
+        return sum(delivery.sent for delivery in self.deliveries)
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+
+class OscSender:
+    # Long-lived UDP sender thread fed through a queue, so pushes never block the UI.
+    # One non-blocking socket serves every destination. pacing_rate limits datagrams
+    # per second per destination (0 sends as fast as the socket allows) unless a
+    # destination sets its own.
+
+    def __init__(self, pacing_rate=0):
+        self.pacing_rate = pacing_rate
+        self.jobs = queue.Queue()
+        self.lock = threading.Lock()
+        self.pending_datagrams = 0
+        self.last_drain_time = None
+        self.last_first_audible = None
+        self.last_push_time = None
+        self.last_error = None
+        self.destinations = {}
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.thread = threading.Thread(target=self._run, name="osc-sender", daemon=True)
+        self.thread.start()
+
+    def submit(self, destinations, messages, bundle=False, mtu=DEFAULT_MTU, on_error=None):
+        return self.submit_datagrams(destinations, build_datagrams(messages, bundle, mtu), on_error)
+
+    def submit_datagrams(self, destinations, datagrams, on_error=None):
+        # Already packed (datagram, message count) pairs, e.g. a pre-encoded cue
+        return self.submit_stages(destinations, [datagrams], on_error)
+
+    def submit_stages(self, destinations, stages, on_error=None, gap=0.0):
+        # One push as priority stages of packed datagrams, sent in order `gap` seconds apart
+        job = SendJob(make_deliveries(destinations, self.pacing_rate), stages, on_error, gap)
+        with self.lock:
+            self.pending_datagrams += len(job.datagrams) * len(job.deliveries)
+        self.jobs.put(job)
+        return job
+
+    def status(self):
+        with self.lock:
+            return {
+                'queue_depth': self.pending_datagrams,
+                'queued_pushes': self.jobs.qsize(),
+                'last_drain_time': self.last_drain_time,
+                'last_first_audible': self.last_first_audible,
+                'last_push_time': self.last_push_time,
+                'last_error': self.last_error,
+                'destinations': {name: dict(counters) for name, counters in self.destinations.items()},
+            }
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                self._send(job)
+            except Exception as e:
+                # Anything but a socket error (e.g. a port out of range) fails this job only
+                logging.exception("OSC send failed")
+                job.error = e
+                with self.lock:
+                    self.pending_datagrams = max(0, self.pending_datagrams - (len(job.datagrams) * len(job.deliveries) - job.sent))
+                    self.last_error = e
+                if job.on_error:
+                    job.on_error(e)
+            finally:
+                job.done.set()
+
+    def _send(self, job):
+        with metrics.stage('send'):
+            timing = deliver_stages(self.sock, job.stages, job.deliveries, job.gap, self._sent)
+        record_deliveries(job.stats, job.deliveries)
+        job.stats.update(timing)
+
+        errors = [delivery for delivery in job.deliveries if delivery.error]
+        for delivery in errors:
+            logging.error(f"OSC send to {delivery.name} failed: {delivery.error}")
+        if errors:
+            job.error = errors[0].error
+            if job.on_error:
+                job.on_error(job.error)
+
+        job.drain_time = time.perf_counter() - job.queued_at
+        with self.lock:
+            for delivery in job.deliveries:
+                counters = self.destinations.setdefault(delivery.name, {
+                    'pushes': 0, 'datagrams': 0, 'bytes': 0, 'errors': 0,
+                    'last_error': None, 'last_drain_time': None})
+                counters['pushes'] += 1
+                counters['datagrams'] += delivery.sent
+                counters['bytes'] += delivery.bytes
+                counters['errors'] += delivery.error is not None
+                counters['last_error'] = delivery.error
+                counters['last_drain_time'] = delivery.drain_time
+                # Datagrams a failed destination never sent leave the queue too
+                self.pending_datagrams -= len(job.datagrams) - delivery.sent
+            self.last_drain_time = job.drain_time
+            if timing['first_audible'] is not None:
+                self.last_first_audible = timing['first_audible']
+                self.last_push_time = timing['push_time']
+            self.last_error = job.error
+        metrics.log_event('send', destinations=[delivery.name for delivery in job.deliveries],
+                          datagrams=job.sent, drain_ms=round(job.drain_time * 1000, 3),
+                          errors={delivery.name: str(delivery.error) for delivery in errors} or None)
+
+    def _sent(self, delivery):
+        with self.lock:
+            self.pending_datagrams -= 1
+
+
+# Created on first use and kept for the life of the process
+_sender = None
+_sender_lock = threading.Lock()
+
+def get_osc_sender(pacing_rate=None):
+    global _sender
+    with _sender_lock:
+        if _sender is None:
+            _sender = OscSender(pacing_rate or 0)
+        elif pacing_rate is not None:
+            _sender.pacing_rate = pacing_rate
+        return _sender
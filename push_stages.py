@@ -0,0 +1,52 @@
+# push_stages.py
+import re
+
+# Priority stages of one push, sent in this order: what is heard first goes first
+STAGE_NAMES = ('Mutes and faders', 'Artist aux sends', 'FX returns')
+MUTES_AND_FADERS, ARTIST_SENDS, FX_RETURNS = range(len(STAGE_NAMES))
+
+SEND_PATTERN = re.compile(r'/Input_Channels/(\d+)/Aux_Send/(\d+)/')
+
+def fx_routing(config):
+    num_fx_units = config.get('num_fx_units', 0)
+    return (frozenset(str(config.get(f'fx_ch_map{k}')) for k in range(1, num_fx_units + 1)),
+            frozenset(str(config.get(f'fx_aux_map{k}')) for k in range(1, num_fx_units + 1)))
+
+def make_stage_classifier(fx_channels, fx_auxes):
+    # address -> stage. Sends from an FX return channel, or into an FX unit's aux, belong
+    # to the FX stage; other aux sends are artist<->artist monitor sends; everything
+    # else (mutes, faders) goes first.
+    stages = {}  # The address space is bounded by the session, classify each address once
+
+    def stage_of(address):
+        stage = stages.get(address)
+        if stage is None:
+            match = SEND_PATTERN.search(address)
+            if match is None:
+                stage = MUTES_AND_FADERS
+            elif match.group(1) in fx_channels or match.group(2) in fx_auxes:
+                stage = FX_RETURNS
+            else:
+                stage = ARTIST_SENDS
+            stages[address] = stage
+        return stage
+    return stage_of
+
+def split_stages(osc_targets, stage_of):
+    # Stable: generation order (mutes first, after coalescing) is kept within each stage
+    stages = [[] for _ in STAGE_NAMES]
+    for target in osc_targets:
+        stages[stage_of(target[0])].append(target)
+    return stages
+
+_classifier = (None, None)
+
+def push_stage_options(config):
+    # (stage_of, gap in seconds) for push_osc_targets, (None, 0.0) when staging is off
+    global _classifier
+    if not config.get('staged_push', True):
+        return None, 0.0
+    routing = fx_routing(config)
+    if _classifier[0] != routing:
+        _classifier = (routing, make_stage_classifier(*routing))
+    return _classifier[1], config.get('stage_gap_ms', 0) / 1000.0
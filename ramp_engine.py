@@ -0,0 +1,184 @@
+# ramp_engine.py
+import time
+import logging
+import threading
+from metrics import metrics
+
+DEFAULT_TICK_RATE = 50  # Intermediate values per second
+
+# Level addresses are faded; their switch address only turns the path off once the fade is down
+LEVEL_LEAVES = ('fader', 'send_level')
+SWITCH_LEVELS = {'mute': ('fader', 1), 'send_on': ('send_level', 0)}
+
+def is_level(address):
+    return address.rpartition('/')[2] in LEVEL_LEAVES
+
+def switch_level(address):
+    # (level address, value that switches the path off) for a mute or send_on address
+    prefix, _, leaf = address.rpartition('/')
+    if leaf not in SWITCH_LEVELS:
+        return None, None
+    level_leaf, off_value = SWITCH_LEVELS[leaf]
+    return f"{prefix}/{level_leaf}", off_value
+
+
+class Ramp:
+    # One level fading from start_db to end_db; switch-offs wait in `deferred` until it lands
+
+    __slots__ = ('address', 'start_db', 'end_db', 'target', 'start', 'duration', 'deferred')
+
+    def __init__(self, address, start_db, end_db, target, start, duration, deferred=None):
+        self.address = address
+        self.start_db = start_db
+        self.end_db = end_db
+        self.target = target
+        self.start = start
+        self.duration = duration
+        self.deferred = deferred if deferred is not None else {}
+
+    def value_at(self, now, curve):
+        # (fader value, finished); interpolated in dB so a fade sounds even across the curve
+        progress = (now - self.start) / self.duration
+        if progress >= 1.0:
+            return self.target, True
+        return curve.value(self.start_db + (self.end_db - self.start_db) * progress, interpolate=True), False
+
+
+class RampEngine:
+    # Fades level changes over a ramp time instead of jumping. One timer thread ticks at
+    # tick_rate while any ramp is running and sends every ramp's next value as one batch,
+    # so the cost per tick grows with the number of ramps, not the number of threads or pushes.
+    # A new target for an address that is already ramping replaces that ramp from its
+    # current value. The thread sleeps when nothing is ramping.
+
+    def __init__(self, tick_rate=DEFAULT_TICK_RATE):
+        self.tick_rate = tick_rate
+        self.cond = threading.Condition()
+        self.ramps = {}  # address -> Ramp, at most one per address
+        self.curve = None
+        self.push = None
+        self.ticks = 0
+        self.last_jitter = None
+        self.max_jitter = 0.0
+        self.thread = threading.Thread(target=self._run, name="ramp-engine", daemon=True)
+        self.thread.start()
+
+    def ramp(self, osc_targets, duration, curve, push, current_values):
+        # Starts ramps for the level targets and returns the targets to send right away.
+        # current_values: what the console holds now (see ConsoleState.snapshot); levels
+        # with no known value are set directly. push(targets) sends one tick's batch.
+        final_values = {}
+        for address, value in osc_targets:
+            final_values[address] = value
+
+        now = time.perf_counter()
+        immediate = []
+        with self.cond:
+            self.curve = curve
+            self.push = push
+            for address, value in final_values.items():
+                if not is_level(address):
+                    continue
+                ramp = self.ramps.get(address)
+                if ramp is not None and ramp.target == value:
+                    continue
+                start_value = ramp.value_at(now, curve)[0] if ramp is not None else current_values.get(address)
+                if duration <= 0 or start_value is None or start_value == value:
+                    self.ramps.pop(address, None)
+                    immediate.append((address, value))
+                    if ramp is not None:
+                        immediate.extend(ramp.deferred.items())
+                    continue
+                self.ramps[address] = Ramp(address, curve.db(start_value), curve.db(value), value, now, duration,
+                                           ramp.deferred if ramp is not None else None)
+
+            for address, value in final_values.items():
+                if is_level(address):
+                    continue
+                level, off_value = switch_level(address)
+                ramp = self.ramps.get(level) if level else None
+                if ramp is not None:
+                    if value == off_value:
+                        # Muted only once the fade out is done
+                        ramp.deferred[address] = value
+                        continue
+                    ramp.deferred.pop(address, None)
+                immediate.append((address, value))
+            if self.ramps:
+                self.cond.notify()
+        return immediate
+
+    def cancel(self):
+        # Drops every running ramp, e.g. before a full resync sets the final values
+        with self.cond:
+            self.ramps.clear()
+
+    def status(self):
+        with self.cond:
+            return {'ramps': len(self.ramps), 'ticks': self.ticks, 'tick_rate': self.tick_rate,
+                    'last_jitter': self.last_jitter, 'max_jitter': self.max_jitter}
+
+    def _run(self):
+        next_tick = time.perf_counter()
+        while True:
+            with self.cond:
+                if not self.ramps:
+                    self.cond.wait_for(lambda: self.ramps)
+                    next_tick = time.perf_counter()
+            interval = 1.0 / self.tick_rate
+
+            # Absolute deadlines on the monotonic perf counter: a late tick does not delay the next one
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            now = time.perf_counter()
+            jitter = now - next_tick
+            metrics.record('ramp_jitter', jitter)
+
+            with self.cond:
+                self.ticks += 1
+                self.last_jitter = jitter
+                self.max_jitter = max(self.max_jitter, jitter)
+                targets = self._tick(now)
+                # Sent under the lock so a newer target can never be overtaken by a stale tick
+                if targets and self.push is not None:
+                    try:
+                        self.push(targets)
+                    except Exception:
+                        logging.exception("Ramp tick push failed")
+
+            next_tick += interval
+            if next_tick < now:
+                # Missed ticks are skipped rather than sent in a burst
+                next_tick = now + interval
+
+    def _tick(self, now):
+        targets = []
+        finished = []
+        for address, ramp in self.ramps.items():
+            value, done = ramp.value_at(now, self.curve)
+            targets.append((address, value))
+            if done:
+                finished.append(ramp)
+        for ramp in finished:
+            del self.ramps[ramp.address]
+            targets.extend(ramp.deferred.items())
+        return targets
+
+
+# Created on first use and kept for the life of the process
+_ramp_engine = None
+_ramp_engine_lock = threading.Lock()
+
+def running_ramp_engine():
+    # The engine if ramps were ever started, without creating its thread otherwise
+    return _ramp_engine
+
+def get_ramp_engine(tick_rate=None):
+    global _ramp_engine
+    with _ramp_engine_lock:
+        if _ramp_engine is None:
+            _ramp_engine = RampEngine(tick_rate or DEFAULT_TICK_RATE)
+        elif tick_rate:
+            _ramp_engine.tick_rate = tick_rate
+        return _ramp_engine
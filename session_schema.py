@@ -0,0 +1,187 @@
+# session_schema.py
+import re
+
+# Structured session file layout. The app keeps working on the flat config dict
+# (widget keys such as name3, ch_map3, toggle_page2_3); sessions are stored as
+# versioned lists of artists, FX units and instruments and converted on load/save.
+SCHEMA_VERSION = 2
+
+ARTIST_FIELDS = {
+    'name': 'name',
+    'ch_map': 'ch_map',
+    'aux_map': 'aux_map',
+    'co_artists_ref_level': 'co_artist_level',
+    'co_artists_ref_level_input': 'co_artist_level_input',
+    'effects_unit': 'fx_unit',
+    'effects_ref_level': 'fx_level',
+    'effects_ref_level_input': 'fx_level_input',
+    'toggle_page2_': 'live',
+}
+
+FX_FIELDS = {
+    'fx_unit': 'name',
+    'fx_ch_map': 'ch_map',
+    'fx_aux_map': 'aux_map',
+}
+
+INSTRUMENT_FIELDS = {
+    'inst_name': 'name',
+    'inst_ch_map': 'ch_map',
+    'inst_fx_unit': 'fx_unit',
+    'inst_fx_lvl': 'fx_level',
+    'inst_toggle_': 'live',
+}
+
+CONSOLE_FIELDS = {
+    'console_ip': 'ip',
+    'send_port': 'send_port',
+    'receive_port': 'receive_port',
+    'osc_bundle': 'bundle',
+    'osc_mtu': 'mtu',
+    'pacing_rate': 'pacing_rate',
+    'extra_destinations': 'extra_destinations',
+}
+
+COUNT_FIELDS = {
+    'num_toggles': 'num_artists',
+    'num_fx_units': 'num_fx_units',
+    'num_instruments': 'num_instruments',
+}
+
+# Kept as they are at the top level of the session file
+TOP_LEVEL_FIELDS = {
+    **COUNT_FIELDS,
+    'cues': 'cues',
+}
+
+LISTS = (
+    ('artists', ARTIST_FIELDS),
+    ('fx_units', FX_FIELDS),
+    ('instruments', INSTRUMENT_FIELDS),
+)
+
+# Longest prefixes first so co_artists_ref_level_input3 is not read as co_artists_ref_level
+_FLAT_KEY = re.compile(r'^(%s)(\d+)$' % '|'.join(sorted(
+    (re.escape(prefix) for _, fields in LISTS for prefix in fields), key=len, reverse=True)))
+_LIST_OF_PREFIX = {prefix: (list_name, field) for list_name, fields in LISTS for prefix, field in fields.items()}
+# Entry fields this version does not know, flattened as "<list>.<field>.<n>"
+_EXTRA_KEY = re.compile(r'^(%s)\.(.+)\.(\d+)$' % '|'.join(re.escape(list_name) for list_name, _ in LISTS))
+
+
+def is_structured(data):
+    return isinstance(data, dict) and 'schema_version' in data
+
+def migrate_flat_config(config):
+    # Flat config dict -> structured session. Every key is kept: unknown keys go to "options".
+    session = {'schema_version': SCHEMA_VERSION, 'session_name': config.get('session_name', ''),
+               'console': {}, 'artists': [], 'fx_units': [], 'instruments': [], 'options': {}}
+
+    for key, value in config.items():
+        if key == 'session_name':
+            continue
+        if key in CONSOLE_FIELDS:
+            session['console'][CONSOLE_FIELDS[key]] = value
+            continue
+        if key in TOP_LEVEL_FIELDS:
+            session[TOP_LEVEL_FIELDS[key]] = value
+            continue
+
+        match = _FLAT_KEY.match(key)
+        if match is not None:
+            (list_name, field), number = _LIST_OF_PREFIX[match.group(1)], match.group(2)
+        else:
+            match = _EXTRA_KEY.match(key)
+            if match is None:
+                session['options'][key] = value
+                continue
+            list_name, field, number = match.groups()
+
+        entries = session[list_name]
+        index = int(number) - 1
+        if index < 0:
+            session['options'][key] = value
+            continue
+        while len(entries) <= index:
+            entries.append({})
+        entries[index][field] = value
+
+    return session
+
+def flatten_session(session):
+    # Structured session -> flat config dict used by the app
+    config = dict(session.get('options', {}))
+    if 'session_name' in session:
+        config['session_name'] = session['session_name']
+
+    console_keys = {field: key for key, field in CONSOLE_FIELDS.items()}
+    for field, value in session.get('console', {}).items():
+        config[console_keys.get(field, field)] = value
+
+    for key, field in TOP_LEVEL_FIELDS.items():
+        if field in session:
+            config[key] = session[field]
+
+    for list_name, fields in LISTS:
+        flat_keys = {field: prefix for prefix, field in fields.items()}
+        for i, entry in enumerate(session.get(list_name, [])):
+            for field, value in entry.items():
+                if field in flat_keys:
+                    config[f'{flat_keys[field]}{i+1}'] = value
+                else:
+                    # Fields this version does not know (e.g. hand-edited) ride along in the
+                    # flat config and go back into their entry on the next save
+                    config[f'{list_name}.{field}.{i+1}'] = value
+
+    return config
+
+def load_session_data(data):
+    # Accepts both structured sessions and legacy flat config files
+    if is_structured(data):
+        if data['schema_version'] > SCHEMA_VERSION:
+            raise ValueError(f"Session schema version {data['schema_version']} is newer than supported ({SCHEMA_VERSION})")
+        return flatten_session(data)
+    return dict(data)
+
+def session_toggles(config):
+    # Live artist and instrument toggles, in plan order
+    artist_toggles = [config.get(f'toggle_page2_{i+1}', False) for i in range(config.get('num_toggles', 1))]
+    instrument_toggles = [config.get(f'inst_toggle_{i+1}', False) for i in range(config.get('num_instruments', 0))]
+    return artist_toggles, instrument_toggles
+
+def store_toggles(config, artist_toggles, instrument_toggles):
+    for i, toggle in enumerate(artist_toggles):
+        config[f'toggle_page2_{i+1}'] = toggle
+    for i, toggle in enumerate(instrument_toggles):
+        config[f'inst_toggle_{i+1}'] = toggle
+
+def parse_destinations(text, pacing_rate=0):
+    # "ip:port" or "ip:port@packets_per_sec", one per line.
+    # Returns ([(ip, port, pacing_rate)], [lines that could not be parsed]).
+    destinations, invalid = [], []
+    for line in (text or '').splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        address, _, rate = line.partition('@')
+        ip, _, port = address.strip().rpartition(':')
+        rate = rate.strip()
+        if not ip or not port.isdigit() or not 0 < int(port) < 65536 or (rate and not rate.isdigit()):
+            invalid.append(line)
+            continue
+        destinations.append((ip, int(port), int(rate) if rate else pacing_rate))
+    return destinations, invalid
+
+def session_destinations(config):
+    # Main console first, then any backup engines or monitor desks, without duplicates
+    pacing_rate = config.get('pacing_rate', 0)
+    destinations = []
+    ip, port = config.get('console_ip', ''), str(config.get('send_port', ''))
+    if ip and port.isdigit() and 0 < int(port) < 65536:
+        destinations.append((ip, int(port), pacing_rate))
+    extra, _ = parse_destinations(config.get('extra_destinations', ''), pacing_rate)
+    seen = {destination[:2] for destination in destinations}
+    for destination in extra:
+        if destination[:2] not in seen:
+            seen.add(destination[:2])
+            destinations.append(destination)
+    return destinations
@@ -0,0 +1,208 @@
+# show_state.py
+import time
+import queue
+import logging
+import threading
+from metrics import metrics
+from config_manager import save_config
+from console_state import console_state, push_osc_targets
+from osc_manager import DEFAULT_MTU, generate_osc_targets, generate_osc_target_changes, load_curve
+from osc_receiver import console_mirror
+from osc_sender import get_osc_sender
+from push_stages import push_stage_options
+from ramp_engine import get_ramp_engine
+from session_schema import session_destinations, session_toggles, store_toggles
+
+def fit_toggles(toggles, count):
+    toggles = list(toggles)[:count]
+    return toggles + [False] * (count - len(toggles))
+
+
+class ShowCommand:
+    # Toggle changes from one session: {index: state} for artists and instruments.
+    # push=False records a state that was already sent, e.g. a fired cue.
+
+    def __init__(self, config, artist_changes, instrument_changes, force_resync=False, observe=False, push=True):
+        self.config = dict(config)
+        self.artist_changes = artist_changes
+        self.instrument_changes = instrument_changes
+        self.force_resync = force_resync
+        self.observe = observe
+        self.push = push
+        self.result = None
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        self.done.wait(timeout)
+        return self.result
+
+
+class ShowResult:
+    # Outcome of one window: everything merged into it went out as this single batch
+
+    __slots__ = ('version', 'commands', 'targets', 'records', 'stats', 'force_resync', 'error')
+
+    def __init__(self, version, commands, targets=0, records=(), stats=None, force_resync=False, error=None):
+        self.version = version
+        self.commands = commands
+        self.targets = targets
+        self.records = records
+        self.stats = stats
+        self.force_resync = force_resync
+        self.error = error
+
+
+class ShowState:
+    # Process-wide live toggles shared by every connected phone. Sessions only submit
+    # changes; one writer thread merges everything queued within `window` seconds,
+    # pushes a single coalesced batch, saves once and bumps the version clients follow.
+
+    def __init__(self, working_directory=None, window=0.05):
+        self.working_directory = working_directory
+        self.window = window
+        self.commands = queue.Queue()
+        self.cond = threading.Condition()
+        self.artist_toggles = None
+        self.instrument_toggles = None
+        self.pushed_toggles = None  # Baseline for incremental generation
+        self.ramping = False  # Level changes were last handed to the ramp engine
+        self.version = 0
+        self.last_result = None
+        self.thread = threading.Thread(target=self._run, name="show-state", daemon=True)
+        self.thread.start()
+
+    def snapshot(self, config):
+        # (version, artist toggles, instrument toggles), seeded from the first session's config
+        with self.cond:
+            if self.artist_toggles is None:
+                self.artist_toggles, self.instrument_toggles = session_toggles(config)
+            return self.version, list(self.artist_toggles), list(self.instrument_toggles)
+
+    def wait_for_change(self, version, timeout=None):
+        # Block until the shared state moves past `version`, returns the current version
+        with self.cond:
+            self.cond.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def submit(self, command):
+        self.commands.put(command)
+        return command
+
+    def _run(self):
+        while True:
+            commands = [self.commands.get()]
+            # Everything arriving within the window is merged into the same push
+            deadline = time.monotonic() + self.window
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    commands.append(self.commands.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                result = self._apply(commands)
+            except Exception as e:
+                logging.exception("Show state update failed")
+                result = ShowResult(self.version, len(commands), error=e)
+            self.last_result = result
+            for command in commands:
+                command.result = result
+                command.done.set()
+
+    def _apply(self, commands):
+        config = commands[-1].config  # The newest routing wins
+        num_artists, num_instruments = config.get('num_toggles', 1), config.get('num_instruments', 0)
+
+        with self.cond:
+            if self.artist_toggles is None:
+                self.artist_toggles, self.instrument_toggles = session_toggles(config)
+            artist_toggles = fit_toggles(self.artist_toggles, num_artists)
+            instrument_toggles = fit_toggles(self.instrument_toggles, num_instruments)
+
+        # Serialized in arrival order, the last change to a toggle wins
+        for command in commands:
+            for index, state in command.artist_changes.items():
+                if index < num_artists:
+                    artist_toggles[index] = state
+            for index, state in command.instrument_changes.items():
+                if index < num_instruments:
+                    instrument_toggles[index] = state
+
+        pushing = [command for command in commands if command.push]
+        force_resync = any(command.force_resync for command in pushing)
+        result = ShowResult(None, len(commands), force_resync=force_resync)
+        if pushing:
+            self._push(config, artist_toggles, instrument_toggles, force_resync,
+                       any(command.observe for command in pushing), result)
+        else:
+            # A fired cue went out as a whole and cancelled any running fades
+            self.pushed_toggles = (artist_toggles, instrument_toggles)
+            self.ramping = False
+
+        store_toggles(config, artist_toggles, instrument_toggles)
+        result.error = result.error or save_config(config)
+
+        with self.cond:
+            self.artist_toggles, self.instrument_toggles = artist_toggles, instrument_toggles
+            self.version += 1
+            result.version = self.version
+            self.cond.notify_all()
+        return result
+
+    def _push(self, config, artist_toggles, instrument_toggles, force_resync, observe, result):
+        destinations = session_destinations(config)
+        destination = tuple((ip, int(port)) for ip, port, *_ in destinations)
+
+        # Only the parameters affected since the last push are regenerated, unless the
+        # console state was reset (failed send) or belongs to another console
+        if force_resync or self.pushed_toggles is None or not console_state.knows(destination):
+            osc_targets = generate_osc_targets(config, artist_toggles, instrument_toggles, self.working_directory)
+        else:
+            osc_targets = generate_osc_target_changes(config, self.pushed_toggles[0], self.pushed_toggles[1],
+                                                      artist_toggles, instrument_toggles, self.working_directory)
+        self.pushed_toggles = (artist_toggles, instrument_toggles)
+
+        # Pushes are queued on the long-lived sender thread, mutes and faders first
+        bundle, mtu = config.get('osc_bundle', False), config.get('osc_mtu', DEFAULT_MTU)
+        sender = get_osc_sender(config.get('pacing_rate', 0))
+        stage_of, stage_gap = push_stage_options(config)
+
+        def push(targets, force_resync=False, observed=None):
+            return push_osc_targets(destinations, targets, force_resync, bundle=bundle, mtu=mtu, sender=sender,
+                                    observed=observed, stage_of=stage_of, stage_gap=stage_gap)
+
+        observed = console_mirror.observations() if observe else None
+        ramp_time = config.get('ramp_time_ms', 0) / 1000.0
+        engine = get_ramp_engine(config.get('ramp_tick_rate')) if ramp_time > 0 or self.ramping else None
+        if engine is None:
+            _, records, stats = push(osc_targets, force_resync, observed)
+        else:
+            # Level changes fade over the ramp time and everything else goes out now.
+            # Holding the engine lock keeps the first tick behind this push.
+            with engine.cond:
+                if force_resync or ramp_time <= 0:
+                    engine.cancel()
+                    immediate = osc_targets
+                else:
+                    immediate = engine.ramp(osc_targets, ramp_time, load_curve(self.working_directory),
+                                            push, console_state.snapshot(destination))
+                _, records, stats = push(immediate, force_resync, observed)
+            self.ramping = ramp_time > 0
+        result.targets = len(osc_targets)
+        result.records = records
+        result.stats = stats
+
+        metrics.count('pushes')
+        metrics.log_event('push', targets=len(osc_targets), changed=len(records), force_resync=force_resync,
+                          merged=result.commands)
+
+
+# Created on first use and shared by every Streamlit session in the process
+_show_state = None
+_show_state_lock = threading.Lock()
+
+def get_show_state(working_directory=None):
+    global _show_state
+    with _show_state_lock:
+        if _show_state is None:
+            _show_state = ShowState(working_directory)
+        return _show_state
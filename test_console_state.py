@@ -0,0 +1,37 @@
+# test_console_state.py
+#
+#   python -m pytest -q test_console_state.py
+import time
+from console_state import ConsoleState
+
+DESTINATION = (('127.0.0.1', 8000),)
+FADER = '/sd/Input_Channels/1/fader'
+
+def committed_state(targets):
+    state = ConsoleState()
+    state.commit(targets, DESTINATION)
+    return state
+
+
+def test_observed_value_is_remembered():
+    # Desk at 1, the operator pulls it down to 0, the show then asks for 0 and later for 1 again
+    state = committed_state([(FADER, 1)])
+    observed = {FADER: (0.0, time.monotonic() + 1)}
+    assert state.diff([(FADER, 0)], DESTINATION, observed=observed) == []
+    assert state.snapshot(DESTINATION)[FADER] == 0
+    assert state.diff([(FADER, 1)], DESTINATION, observed=observed) == [(FADER, 1)]
+    assert state.diff([(FADER, 1)], DESTINATION) == [(FADER, 1)]
+
+def test_stale_echo_is_not_trusted():
+    # The desk echoed 0.76, then 0 was sent; the echo of 0 has not arrived yet
+    echoed_at = time.monotonic() - 1
+    state = committed_state([(FADER, 0.76)])
+    state.commit([(FADER, 0)], DESTINATION)
+    observed = {FADER: (0.76, echoed_at)}
+    assert state.diff([(FADER, 0.76)], DESTINATION, observed=observed) == [(FADER, 0.76)]
+
+def test_fresh_observation_of_an_untouched_parameter_is_left_alone():
+    state = committed_state([(FADER, 1)])
+    observed = {FADER: (0.5, time.monotonic() + 1)}
+    assert state.diff([(FADER, 1)], DESTINATION, observed=observed) == []
+    assert state.diff([(FADER, 1)], DESTINATION, force_resync=True, observed=observed) == [(FADER, 1)]
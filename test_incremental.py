@@ -0,0 +1,60 @@
+# test_incremental.py
+#
+#   python -m pytest -q test_incremental.py
+import random
+import pytest
+from benchmark import MAPPING_DIRECTORY, make_config
+from mix_plan import IncrementalGenerator, generate_plan_targets, get_mix_plan
+from osc_manager import load_curve
+
+SESSIONS = [(1, 0, 0), (2, 1, 0), (4, 2, 3), (8, 3, 4), (12, 0, 5), (16, 4, 8)]
+
+def final_values(osc_targets):
+    values = {}
+    for address, value in osc_targets:
+        values[address] = value
+    return values
+
+def random_toggles(rng, count):
+    return [rng.random() < 0.5 for _ in range(count)]
+
+
+@pytest.mark.parametrize('num_artists, num_fx_units, num_instruments', SESSIONS)
+def test_incremental_matches_full_generation(num_artists, num_fx_units, num_instruments):
+    rng = random.Random(num_artists * 1000 + num_fx_units * 100 + num_instruments)
+    plan = get_mix_plan(make_config(num_artists, num_fx_units, num_instruments), load_curve(MAPPING_DIRECTORY))
+
+    artist_toggles = random_toggles(rng, num_artists)
+    instrument_toggles = random_toggles(rng, num_instruments)
+    generator = IncrementalGenerator(plan, artist_toggles, instrument_toggles)
+    assert generator.targets() == generate_plan_targets(plan, artist_toggles, instrument_toggles)
+    console = final_values(generator.targets())
+    previous = dict(console)
+
+    for _ in range(200):
+        # Mostly single toggles as in a show, sometimes whole scene changes
+        if rng.random() < 0.8:
+            if num_instruments and rng.random() < 0.3:
+                instrument_toggles = list(instrument_toggles)
+                m = rng.randrange(num_instruments)
+                instrument_toggles[m] = not instrument_toggles[m]
+            else:
+                artist_toggles = list(artist_toggles)
+                i = rng.randrange(num_artists)
+                artist_toggles[i] = not artist_toggles[i]
+        else:
+            artist_toggles = random_toggles(rng, num_artists)
+            instrument_toggles = random_toggles(rng, num_instruments)
+
+        changes = generator.update(artist_toggles, instrument_toggles)
+        full = generate_plan_targets(plan, artist_toggles, instrument_toggles)
+        assert generator.targets() == full
+
+        # No change repeats what the previous generation already set, and applying them
+        # leaves each generated address at its fully generated value
+        for address, value in changes:
+            assert previous.get(address) != value
+        console.update(changes)
+        expected = final_values(full)
+        assert {address: console.get(address) for address in expected} == expected
+        previous = expected
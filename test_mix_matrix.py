@@ -0,0 +1,55 @@
+# test_mix_matrix.py
+#
+#   python -m pytest -q test_mix_matrix.py
+import random
+import pytest
+from benchmark import MAPPING_DIRECTORY
+from mix_plan import generate_plan_targets, get_mix_plan
+from osc_manager import coalesce_osc_targets, load_curve
+
+pytest.importorskip('numpy')
+from mix_matrix import generate_matrix_targets, get_matrix_plan  # noqa: E402
+
+SESSIONS = [(1, 0, 0), (2, 1, 1), (4, 2, 3), (8, 3, 4), (12, 0, 5), (16, 4, 8)]
+
+def colliding_config(num_artists, num_fx_units, num_instruments, rng):
+    # Channels and auxes drawn from small shared ranges, so artists, FX returns and
+    # instruments land on each other's channels and auxes as on a crowded desk
+    channels = max(2, (num_artists + num_fx_units + num_instruments) // 2)
+    auxes = max(2, (num_artists + num_fx_units) // 2)
+    config = {'num_toggles': num_artists, 'num_fx_units': num_fx_units, 'num_instruments': num_instruments}
+    for i in range(1, num_artists + 1):
+        config[f'name{i}'] = f'Artist {i}'
+        config[f'ch_map{i}'] = rng.randint(1, channels)
+        config[f'aux_map{i}'] = rng.randint(1, auxes)
+        config[f'effects_unit{i}'] = rng.randint(0, num_fx_units)
+        config[f'effects_ref_level{i}'] = rng.randint(-20, 0)
+        config[f'co_artists_ref_level{i}'] = rng.randint(-20, 0)
+    for k in range(1, num_fx_units + 1):
+        config[f'fx_unit{k}'] = f'FX {k}'
+        config[f'fx_ch_map{k}'] = rng.randint(1, channels)
+        config[f'fx_aux_map{k}'] = rng.randint(1, auxes)
+    for k in range(1, num_instruments + 1):
+        config[f'inst_name{k}'] = f'Instrument {k}'
+        config[f'inst_ch_map{k}'] = rng.randint(1, channels)
+        config[f'inst_fx_unit{k}'] = rng.randint(0, num_fx_units)
+        config[f'inst_fx_lvl{k}'] = rng.randint(-10, 0)
+    return config
+
+
+@pytest.mark.parametrize('num_artists, num_fx_units, num_instruments', SESSIONS)
+def test_matrix_matches_coalesced_python_generation(num_artists, num_fx_units, num_instruments):
+    rng = random.Random(num_artists * 1000 + num_fx_units * 100 + num_instruments)
+    curve = load_curve(MAPPING_DIRECTORY)
+    for _ in range(10):
+        config = colliding_config(num_artists, num_fx_units, num_instruments, rng)
+        plan = get_mix_plan(config, curve)
+        mplan = get_matrix_plan(plan, config, curve)
+        for _ in range(20):
+            artist_toggles = [rng.random() < 0.5 for _ in range(num_artists)]
+            instrument_toggles = [rng.random() < 0.5 for _ in range(num_instruments)]
+            expected, _ = coalesce_osc_targets(generate_plan_targets(plan, artist_toggles, instrument_toggles))
+            matrix_targets = generate_matrix_targets(mplan, artist_toggles, instrument_toggles)
+            # One write per address; the order within a push may differ
+            assert len({address for address, _ in matrix_targets}) == len(matrix_targets)
+            assert dict(matrix_targets) == dict(expected)
@@ -0,0 +1,79 @@
+# test_osc_encoding.py
+#
+#   python -m pytest -q test_osc_encoding.py
+import random
+import struct
+import pytest
+from osc_manager import (OscAddressTable, create_osc_message, create_typed_osc_message, decode_osc_packet,
+                         encode_float_batch, encode_float_batch_numpy, encode_osc_batch, encode_osc_records)
+
+def float_targets(count, seed=0):
+    # Addresses of every padding length, values including 0, 1 and ints sent as floats
+    rng = random.Random(seed)
+    targets = []
+    for n in range(count):
+        address = f"/sd/Input_Channels/{rng.randint(1, 128)}/{'x' * (n % 5)}fader"
+        value = rng.choice([0, 1, 0.76, rng.random(), -rng.random() * 100])
+        targets.append((address, value))
+    return targets
+
+TYPED_TARGETS = [
+    ('/sd/Input_Channels/1/fader', 0.76),
+    ('/int', (7,)),
+    ('/negative', (-123456,)),
+    ('/float', (0.5,)),
+    ('/true', (True,)),
+    ('/false', (False,)),
+    ('/s', ('a',)),
+    ('/name', ('Lead Vocal',)),
+    ('/four', ('abcd',)),
+    ('/multi', (1, 2.5, 'abc', True, False)),
+    ('/flags', (True, False, True)),
+    ('/empty', ()),
+]
+
+
+def test_float_batch_matches_per_message_encoding():
+    targets = float_targets(500)
+    expected = [create_osc_message(address, value) for address, value in targets]
+    assert [bytes(message) for message in encode_float_batch(targets, OscAddressTable())] == expected
+    assert [bytes(message) for message in encode_osc_batch(targets, vectorize=False)] == expected
+
+def test_numpy_batch_matches_per_message_encoding():
+    pytest.importorskip('numpy')
+    for count in (1, 2, 63, 64, 1000):
+        targets = float_targets(count, seed=count)
+        expected = [create_osc_message(address, value) for address, value in targets]
+        assert [bytes(message) for message in encode_float_batch_numpy(targets, OscAddressTable())] == expected
+        assert [bytes(message) for message in encode_osc_batch(targets, vectorize=True)] == expected
+    assert encode_float_batch_numpy([]) == []
+
+def test_typed_messages_match_the_osc_layout():
+    assert create_typed_osc_message('/int', (7,)) == b'/int\x00\x00\x00\x00,i\x00\x00' + struct.pack('>i', 7)
+    assert create_typed_osc_message('/float', (0.5,)) == b'/float\x00\x00,f\x00\x00' + struct.pack('>f', 0.5)
+    assert create_typed_osc_message('/s', ('abcd',)) == b'/s\x00\x00,s\x00\x00abcd\x00\x00\x00\x00'
+    assert create_typed_osc_message('/t', (True, False)) == b'/t\x00\x00,TF\x00'
+    assert create_typed_osc_message('/e', ()) == b'/e\x00\x00,\x00\x00\x00'
+
+def test_typed_batch_matches_per_message_encoding():
+    expected = [create_typed_osc_message(address, value) if isinstance(value, tuple)
+                else create_osc_message(address, value) for address, value in TYPED_TARGETS]
+    assert [bytes(message) for message in encode_osc_batch(TYPED_TARGETS)] == expected
+
+    for (address, value), record in zip(TYPED_TARGETS, encode_osc_records(TYPED_TARGETS)):
+        assert bytes(record.data) == (create_typed_osc_message(address, value) if isinstance(value, tuple)
+                                      else create_osc_message(address, value))
+        decoded_address, arguments = decode_osc_packet(record.data)[0]
+        assert decoded_address == address
+        if isinstance(value, tuple):
+            assert record.type_tag == ''.join('T' if v is True else 'F' if v is False else
+                                              'i' if isinstance(v, int) else 'f' if isinstance(v, float) else 's'
+                                              for v in value)
+            assert arguments == list(value)
+        else:
+            assert record.type_tag == 'f'
+            assert arguments == [pytest.approx(value, rel=1e-6)]
+
+def test_unsupported_argument_type():
+    with pytest.raises(TypeError):
+        create_typed_osc_message('/bytes', (b'raw',))
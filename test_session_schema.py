@@ -0,0 +1,33 @@
+# test_session_schema.py
+#
+#   python -m pytest -q test_session_schema.py
+from session_schema import SCHEMA_VERSION, flatten_session, load_session_data, migrate_flat_config
+
+SESSION = {
+    'schema_version': SCHEMA_VERSION,
+    'session_name': 'Festival',
+    'console': {'ip': '10.0.0.2', 'send_port': 8000},
+    'artists': [
+        {'name': 'Lead', 'ch_map': 1, 'aux_map': 1, 'live': True, 'iem_pack': 'B3', 'notes.v2': 'spare'},
+        {'name': 'Keys', 'ch_map': 2, 'aux_map': 2, 'live': False, 'color2': 'red'},
+    ],
+    'fx_units': [{'name': 'Reverb', 'ch_map': 40, 'aux_map': 12, 'return': 'stereo'}],
+    'instruments': [{'name': 'Guitar', 'ch_map': 5, 'live': True, 'amp': {'model': 'AC30'}}],
+    'options': {'theme': 'dark'},
+    'num_artists': 2,
+    'num_fx_units': 1,
+    'num_instruments': 1,
+}
+
+
+def test_save_load_save_keeps_unknown_entry_fields():
+    config = load_session_data(SESSION)
+    saved = migrate_flat_config(config)
+    assert saved == SESSION
+    assert migrate_flat_config(load_session_data(saved)) == saved
+
+def test_legacy_flat_keys_still_migrate():
+    session = migrate_flat_config({'name1': 'Lead', 'co_artists_ref_level_input1': -6, 'unknown_key': 1})
+    assert session['artists'] == [{'name': 'Lead', 'co_artist_level_input': -6}]
+    assert session['options'] == {'unknown_key': 1}
+    assert flatten_session(session)['co_artists_ref_level_input1'] == -6